@@ -10,20 +10,32 @@ def get_base_path():
 
 BASE_PATH = get_base_path()
 
-from PySide6.QtWidgets import QApplication
-from gui.MainWindow import MainWindow
+from backend import StartupReport as sr
+with sr.timed("gui", "import"):
+    from PySide6.QtWidgets import QApplication
+    from gui.MainWindow import MainWindow
 import sys
 import signal
 
 def main():
+    # --startup-report: print import/init timing per component once the models are loaded
+    startup_report = "--startup-report" in sys.argv
+    if startup_report:
+        sys.argv.remove("--startup-report")
+
     app = QApplication(sys.argv)
     style_path = BASE_PATH / "gui" / "style.qss"
     with open(style_path, "r") as f:
         app.setStyleSheet(f.read())
 
     # window
-    window = MainWindow()
-    window.show()
+    with sr.timed("gui", "window init"):
+        window = MainWindow()
+        window.show()
+    if startup_report:
+        window.model_loader.ready.connect(lambda: print(sr.report()))
+        window.model_loader.failed.connect(lambda _: print(sr.report()))
+    window.startLoading()
 
     def cleanup():
         try:
@@ -0,0 +1,137 @@
+#Asr Benchmark = fp32 vs int8 Parakeet on the same WAV set
+#usage: python -m backend.AsrBenchmark --wavs ./bench_wavs [--variants fp32 int8] [--config config.yaml]
+#       every foo.wav may have a foo.txt reference transcript next to it for WER
+import sys
+import re
+import time
+import wave
+import queue
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+
+import yaml
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+VARIANTS = {"fp32": None, "int8": "int8"}      # variant name -> onnx_asr quantization
+
+
+def readWav(path)->np.ndarray:
+    #16-bit PCM wav -> mono float32 at 16 kHz
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM wav is supported")
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    audio = pcm.reshape(-1, channels).mean(axis=1).astype(np.float32) / 32768.0
+    if rate != SAMPLE_RATE: #linear resample, good enough for a relative comparison
+        n = int(round(audio.size * SAMPLE_RATE / rate))
+        audio = np.interp(np.linspace(0, audio.size - 1, n), np.arange(audio.size), audio).astype(np.float32)
+    return audio
+
+
+def normWords(text:str)->list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def editDistance(ref:list,hyp:list)->int:
+    #word level Levenshtein, one row at a time
+    prev = np.arange(len(hyp) + 1)
+    for i, r in enumerate(ref, 1):
+        cur = np.empty_like(prev)
+        cur[0] = i
+        sub = prev[:-1] + (np.array(hyp, dtype=object) != r)
+        for j in range(1, len(hyp) + 1):
+            cur[j] = min(sub[j - 1], prev[j] + 1, cur[j - 1] + 1)
+        prev = cur
+    return int(prev[-1])
+
+
+def peakRssMb():
+    try:
+        import resource
+    except ImportError: #Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024     #bytes on macOS, KB elsewhere
+
+
+def runVariant(asr_cfg:dict,variant:str,wavs:list,results):
+    #child process: load one variant, decode every wav, report timing/memory/errors
+    from . import AsrModel as am
+
+    cfg = dict(asr_cfg, quantization=VARIANTS[variant])
+    start = time.perf_counter()
+    model = am.NvidiaParakeet(cfg)
+    load_sec = time.perf_counter() - start
+
+    audio_sec = decode_sec = 0.0
+    errors = ref_words = 0
+    for path in wavs:
+        audio = readWav(path)
+        start = time.perf_counter()
+        text = model.transcribe(audio)
+        decode_sec += time.perf_counter() - start
+        audio_sec += audio.size / SAMPLE_RATE
+
+        ref_path = Path(path).with_suffix(".txt")
+        if ref_path.exists():
+            ref = normWords(ref_path.read_text(encoding="utf-8"))
+            errors += editDistance(ref, normWords(text))
+            ref_words += len(ref)
+
+    results.put({
+        "variant": variant,
+        "load_sec": load_sec,
+        "rtf": decode_sec / audio_sec if audio_sec else float("nan"),
+        "peak_rss_mb": peakRssMb(),
+        "wer": errors / ref_words if ref_words else None,
+        "files": len(wavs),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Parakeet variants on a WAV set")
+    parser.add_argument("--wavs", required=True, help="directory of 16-bit PCM .wav files (+ optional .txt references)")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--config", default=str(Path(__file__).parent.parent / "config.yaml"))
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r") as f:
+        asr_cfg = yaml.safe_load(f)["asr"]
+    wavs = sorted(str(p) for p in Path(args.wavs).glob("*.wav"))
+    if not wavs:
+        parser.error(f"no .wav files in {args.wavs}")
+
+    #one fresh process per variant so peak RSS is not shared between them
+    ctx = mp.get_context("spawn")
+    rows = []
+    for variant in args.variants:
+        results = ctx.Queue()
+        proc = ctx.Process(target=runVariant, args=(asr_cfg, variant, wavs, results))
+        proc.start()
+        #read before join: the child cannot exit until its queued result is flushed to the pipe
+        row = None
+        while row is None and (proc.is_alive() or not results.empty()):
+            try:
+                row = results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+        proc.join()
+        if row is None:
+            print(f"[ERROR] variant {variant} failed (exit code {proc.exitcode})")
+            continue
+        rows.append(row)
+
+    print(f"{'variant':<8} {'files':>5} {'load s':>8} {'RTF':>7} {'peak RSS MB':>12} {'WER':>7}")
+    for r in rows:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        wer = f"{100 * r['wer']:.2f}%" if r["wer"] is not None else "n/a"
+        print(f"{r['variant']:<8} {r['files']:>5} {r['load_sec']:>8.2f} {r['rtf']:>7.3f} {rss:>12} {wer:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import yaml
+import time
 from abc import ABC, abstractmethod
 import numpy as np
 
-#asr model imports 
-import onnx_asr
+#asr model imports, onnx_asr is imported on first model load
+from . import OrtUtils as ou
+from . import ModelCache as mc
+from . import StartupReport as sr
+
+SAMPLE_RATE = 16000     #onnx_asr models expect 16 kHz mono
 
 class AsrModel(ABC):  #Uniform Interface for ASR Models 
     @abstractmethod
@@ -11,6 +16,10 @@ class AsrModel(ABC):  #Uniform Interface for ASR Models
         # transcribe audio file given path
         pass
     @abstractmethod
+    def transcribeWords(self,audio_sample:np.ndarray)->list:
+        # transcribe audio into [(word, start_sec, end_sec), ...]
+        pass
+    @abstractmethod
     def __str__(self):
         #srting representation 
         pass
@@ -18,7 +27,29 @@ class AsrModel(ABC):  #Uniform Interface for ASR Models
 class NvidiaParakeet(ABC):
     def __init__(self,cfg_file):
         self.model_name = cfg_file["model_name"]
-        self.asr_model = onnx_asr.load_model(cfg_file["model_name"],cfg_file["model_dir"])
+        self.quantization = cfg_file.get("quantization")      # None = fp32, "int8" = *.int8.onnx files
+        model_dir, sess_options = cfg_file["model_dir"], ou.sessionOptions(cfg_file)   # threads / graph optimization / arena from config
+        if cfg_file.get("cache", True): #pre-optimized graphs from the model cache, built on first start
+            model_dir, sess_options = mc.ModelCache(cfg_file).prepare()
+        onnx_asr = sr.lazyImport("onnx_asr", "asr")
+        self.asr_model = onnx_asr.load_model(
+            cfg_file["model_name"],
+            model_dir,
+            quantization=self.quantization,
+            sess_options=sess_options,
+            providers=ou.providers(cfg_file),
+        )
+        self.asr_timed = self.asr_model.with_timestamps()       # same sessions, token timestamps from the TDT decoder
+        self.warmup(cfg_file.get("warmup_sec", 1.0))
+
+    def warmup(self,seconds:float):
+        #pay graph optimization / allocator growth at load, not on the first utterance
+        if seconds <= 0:
+            return
+        start = time.perf_counter()
+        noise = np.random.default_rng(0).normal(0, 0.01, int(seconds * SAMPLE_RATE)).astype(np.float32)
+        self.asr_timed.recognize(noise)
+        print(f"[INFO] {self} warm-up took {time.perf_counter() - start:.2f}s")
 
     def transcribe(self,audio_sample:np.ndarray)->str:
         if len(audio_sample) == 0:
@@ -30,7 +61,28 @@ class NvidiaParakeet(ABC):
             text = self.asr_model.recognize(decode_audio)
             return text 
 
+    def transcribeWords(self,audio_sample:np.ndarray)->list:
+        if len(audio_sample) == 0:
+            return []
+        result = self.asr_timed.recognize(audio_sample.astype(np.float32, copy=False))
+        duration = len(audio_sample) / SAMPLE_RATE
+
+        #group sentencepiece tokens into words, a leading space/"\u2581" starts a new word
+        words = []
+        for token, start in zip(result.tokens or [], result.timestamps or []):
+            if not words or token.startswith((" ", "\u2581")):
+                words.append([token.replace("\u2581", " ").strip(), start, start])
+            else:
+                words[-1][0] += token
+
+        #decoder only gives token starts: a word ends where the next one begins
+        for cur, nxt in zip(words, words[1:]):
+            cur[2] = nxt[1]
+        if words:
+            words[-1][2] = max(words[-1][1], duration)
+        return [tuple(w) for w in words if w[0]]
+
     def __str__(self):
-        return self.model_name
+        return f"{self.model_name} ({self.quantization})" if self.quantization else self.model_name
 
         
@@ -1,7 +1,8 @@
 import yaml
 import time
 import numpy as np
-import collections
+import threading
+import concurrent.futures as cf
 
 from datetime import datetime
 
@@ -9,13 +10,21 @@ from . import MicrophoneStreamer as ms
 from . import VadUtils as vadu 
 from . import AsrModel as am 
 from . import DiarizationUtil as du
+from . import StreamDecoder as sd
+from . import AudioBuffer as ab
+from . import InferenceExecutor as ie
+from . import SegmentHistory as sh
+from . import TranscriptJournal as tj
+from . import WordTimeline as wt
 
 from PySide6.QtCore import QObject, Signal
 
 
 class ParakeetAsrWorker(QObject):
-    stable = Signal(str)
+    stable = Signal(int, str)           # (segment seq, line)
     partial = Signal(str)
+    speaker_ready = Signal(int, str)    # (segment seq, line with backfilled speaker)
+    rediarized = Signal(int)            # number of speaker labels changed by the end-of-session pass
 
     def __init__(self,mic:ms,asr_model:am,vad:vadu,diarize:du,cfg_file):
         super().__init__()
@@ -27,49 +36,305 @@ class ParakeetAsrWorker(QObject):
         self.cfg_file = cfg_file
 
         #result boundaries 
-        self.final_char_budget = int(cfg_file["max_history_sec"]*18)                                 #character limit 
         self.max_samples = int(cfg_file["window_sec"] * cfg_file["sample_rate"])                     #maximum # of sample limit
         self.keep_left = int(cfg_file["context_overlap_sec"] * self.cfg_file["sample_rate"])    #target size to trim buffer
         self.chunk_max_sec = cfg_file["chunk_max_sec"]
         self.block_ms = cfg_file["block_ms"]
 
+        #streaming mode: decode only new audio + bounded left context, commit agreed words
+        self.decoder = None
+        self.models_ready = threading.Event()               # set by attachModels(), inference waits on it
+
         #live results and flag 
-        self.final_segments = collections.deque(maxlen=9999)
+        self.final_segments = sh.SegmentHistory(cfg_file)                                           #retention by audio time or characters
         self.current_partial = ""
+        self.last_partial = None                            # (text, speaker) of the last partial emitted
         self.running = True
-
-    def flushTotext(self,buf,force=False): 
-        
-        if not buf: #if buffer empty 
-            return "","",""
+        self.audio_gap_sec = cfg_file.get("audio_gap_sec", 0.6)        # no audio this long closes an open utterance
+
+        #inference runs on its own thread so the VAD loop keeps draining the mic queue
+        self.executor = ie.InferenceExecutor(self.runJob, cfg_file, ready=self.models_ready)
+        self.utterance = 0                                  # counter of finished utterances
+        self.speech_start = 0                               # stream sample where the open utterance began
+        self.decoding = 0                                   # utterance the streaming decoder / speaker cache hold state for
+
+        #speaker id runs next to ASR; one thread keeps the speaker registry updates ordered
+        self.speaker_pool = cf.ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarize")
+        self.speaker_backfill = cfg_file.get("speaker_backfill", False)   # emit text first, speaker when ready
+        self.partial_speaker = cfg_file.get("partial_speaker", "cached")  # skip / cached embedding on partials
+        self.next_seq = 0                                   # id of the next stable segment
+        self.speaker_turns = cfg_file.get("speaker_turns", False)          # split finals at speaker changes before emitting
+        self.rediarize_on_stop = cfg_file.get("rediarize_on_stop", False)  # recluster the whole session when stopped
+
+        self.words = wt.WordTimeline(cfg_file["sample_rate"])  # word timings of every stable segment, for caption export
+        self.speaker_index = sh.SpeakerIndex()              # labels of every segment of the session, for rediarize()
+        self.relabel_lock = threading.Lock()                # new segments vs. relabels from the diarize / GUI thread
+        self.stream_epoch = time.time()                     # wall clock time of stream sample 0
+
+        #every stable segment goes to disk, an interrupted session is picked up again
+        self.journal = tj.TranscriptJournal(cfg_file) if cfg_file.get("journal", True) else None
+        if self.journal is not None:
+            for segment in self.journal.recovered:
+                self.final_segments.append(segment)
+                self.next_seq = max(self.next_seq, segment.seq + 1)
+
+        if asr_model is not None and diarize is not None:
+            self.attachModels(asr_model, diarize)
+
+    def attachModels(self,asr_model:am,diarize:du):
+        #models may arrive after run() started, speech captured until then is queued and transcribed now
+        self.asr_model = asr_model
+        self.diarize = diarize
+        self.decoder = sd.StreamingDecoder(asr_model, self.cfg_file) if self.cfg_file.get("streaming", False) else None
+        diarize.registry.on_merge = self.speakerMerged
+        self.models_ready.set()
+
+    def stamp(self,sample:int)->str:
+        #wall clock HH:MM:SS of a stream sample
+        return datetime.fromtimestamp(self.stream_epoch + sample / self.cfg_file["sample_rate"]).strftime("%H:%M:%S")
+
+    def timedWords(self,samples:np.ndarray,origin:int)->list:
+        #[(word, start, end)] on the stream sample clock
+        sr = self.cfg_file["sample_rate"]
+        return [(w, origin + int(s * sr), origin + int(e * sr)) for w, s, e in self.asr_model.transcribeWords(samples)]
+
+    def flushTotext(self,samples:np.ndarray,force=False,origin=0,key=None,start=None): 
+        # -> text, speaker, ts, words (words only on forced flushes)
+        # origin = stream sample of samples[0], start = utterance start for the timestamp (origin if not trimmed)
+        start = origin if start is None else start
+        if samples.size == 0: #if buffer empty 
+            if force and self.decoder is not None:
+                self.decoder.reset()
+            return "","","",None
         
-        samples = np.concatenate(list(buf), axis=0)
         dur = samples.size / self.cfg_file["sample_rate"]
 
         if not force and dur < self.cfg_file["chunk_min_sec"]:
-            return "","",""
+            return "","","",None
         
-        text = self.asr_model.transcribe(samples) 
-        speaker = self.diarize.identify(samples)
-        ts = datetime.now().strftime("%H:%M:%S")
-
-        return text,speaker,ts
-    
-    def trimHistoryToBudget(self):
-        total = sum(len(s) for s in self.final_segments)
-        while total > self.final_char_budget and self.final_segments:
-            total -= len(self.final_segments.popleft())
+        #runs alongside the ASR call, only the final flush commits a speaker
+        if force:
+            speaker = self.speaker_pool.submit(self.diarize.commit, samples, origin, key)
+        elif self.partial_speaker == "cached":
+            speaker = self.speaker_pool.submit(self.diarize.peek, samples, origin)
+        else:
+            speaker = du.UNKNOWN_SPEAKER
+        words = None
+        if force: #final text comes with word timings from the TDT decoder
+            words = self.decoder.finalizeWords(samples, origin) if self.decoder is not None else self.timedWords(samples, origin)
+            text = " ".join(w for w, _, _ in words)
+            ts = self.stamp(start)
+        elif self.decoder is None:
+            text = self.asr_model.transcribe(samples) 
+            ts = self.stamp(start)                  # utterance start, the partial line only changes with its text
+        else:
+            stable, tentative = self.decoder.update(samples, origin)
+            text = (stable + " " + tentative).strip()
+            ts = self.stamp(start)
+
+        if isinstance(speaker, cf.Future) and not (force and self.speaker_backfill):
+            speaker = speaker.result()
+
+        return text,speaker,ts,words
+
+    def flushTurns(self,samples:np.ndarray,origin=0,key=None,start=None):
+        #forced flush split at speaker changes -> [(words, speaker, start, end)]
+        #(the first turn starts at the utterance start, also when the buffer was trimmed past it)
+        if samples.size == 0:
+            if self.decoder is not None:
+                self.decoder.reset()
+            return []
+        turns = self.speaker_pool.submit(self.diarize.commitTurns, samples, origin, key)
+        if self.decoder is not None: #decode once, hand every word to the turn its midpoint falls in
+            words = self.decoder.finalizeWords(samples, origin)
+            turns = turns.result()
+            cuts = [end for _, end, _ in turns[:-1]]
+            parts = [[] for _ in turns]
+            for w in words:
+                parts[int(np.searchsorted(cuts, (w[1] + w[2]) // 2, side="right"))].append(w)
+        else: #short inputs per speaker
+            turns = turns.result()
+            parts = [self.timedWords(samples[s - origin:e - origin], s) for s, e, _ in turns]
+        first = origin if start is None else start
+        return [(part, speaker, s if i else min(s, first), e) for i, (part, (s, e, speaker)) in enumerate(zip(parts, turns))]
+
+    def emitStable(self,ts:str,speaker,text:str,key=None,start=0,end=0,words=None):
+        pending = speaker if isinstance(speaker, cf.Future) else None
+        if pending is not None:
+            speaker = du.UNKNOWN_SPEAKER
+        seq = self.next_seq
+        self.next_seq += 1
+        with self.relabel_lock:
+            speaker = self.diarize.registry.resolve(speaker)    # merged while this segment was decoded
+            segment = sh.Segment(seq, ts, speaker, text.strip(), start, end, key)   # key = segment embedding in diarize, for rediarize()
+            self.final_segments.append(segment)
+            self.speaker_index.append(segment)
+            self.words.append(seq, speaker, words or [])
+            if self.journal is not None:
+                self.journal.append(segment)
+            self.stable.emit(seq, segment.line())
+        print(f"[DEBUG] stable emitted: {segment.text}")
+        if pending is not None:
+            pending.add_done_callback(lambda f: self.backfillSpeaker(segment, f))
+
+    def appendSpeech(self,buf:ab.AudioRingBuffer,recent:ab.AudioRingBuffer,start:int,end:int):
+        #copy stream samples [start, end) from the recent audio into the utterance buffer
+        start = max(start, recent.start)
+        if end <= start:
+            return
+
+        #Streaming: audio before the decoder's left context is never decoded again
+        #(only once the decoder has caught up with this utterance)
+        if self.decoder is not None and self.decoding == self.utterance:
+            buf.trimBefore(self.decoder.keepFrom())
+
+        #Trim buffer if too big
+        if len(buf) + (end - start) > self.max_samples:
+            buf.trimTo(self.keep_left)
+
+        buf.append(recent.view()[start - recent.start:end - recent.start])
+
+    def submit(self,buf:ab.AudioRingBuffer,final=False):
+        #snapshot the utterance for the inference thread, never waits on the model
+        if not final and len(buf) < self.cfg_file["chunk_min_sec"] * self.cfg_file["sample_rate"]:
+            return
+        job = ie.InferenceJob(final, self.utterance, buf.view().copy(), buf.start, self.speech_start)
+        if final:
+            self.executor.submitFinal(job)
+            self.utterance += 1
+        else:
+            self.executor.submitPartial(job)
+
+    def runJob(self,job:ie.InferenceJob):
+        #inference thread
+        if job.utterance != self.decoding:                  #previous utterance's final was dropped
+            if self.decoder is not None:
+                self.decoder.reset()
+            self.speaker_pool.submit(self.diarize.resetUtterance)
+            self.decoding = job.utterance
+        if job.final and self.speaker_turns:
+            turns = self.flushTurns(job.samples, origin=job.origin, key=job.utterance, start=job.start)
+            self.decoding = job.utterance + 1
+            self.current_partial = ""
+            self.last_partial = None
+            for i, (words, speaker, start, end) in enumerate(turns):
+                text = " ".join(w for w, _, _ in words)
+                if text.strip():
+                    self.emitStable(self.stamp(start), speaker, text, key=(job.utterance, i), start=start, end=end, words=words)
+            return
+
+        key = job.utterance if job.final else None
+        text, speaker, ts, words = self.flushTotext(job.samples, force=job.final, origin=job.origin, key=key, start=job.start)
+        if job.final:
+            self.decoding = job.utterance + 1
+            self.current_partial = ""
+            self.last_partial = None
+            if text and text.strip():
+                self.emitStable(ts, speaker, text, key=key, start=job.start, end=job.origin + job.samples.size, words=words)
+        elif text and text.strip():
+            if (text, speaker) == self.last_partial: #nothing new to show
+                return
+            self.current_partial = text
+            self.last_partial = (text, speaker)
+            self.partial.emit(f"[{ts}] {speaker}: {text}")
+            print(f"[DEBUG] partial emitted: {text}")
+
+    def backfillSpeaker(self,segment:sh.Segment,future:cf.Future):
+        #diarize thread (or inference thread if it already finished)
+        try:
+            speaker = future.result()
+        except Exception as e:
+            print(f"[ERROR] speaker identification failed: {e}")
+            return
+        with self.relabel_lock:
+            self.setSpeaker(segment.seq, self.diarize.registry.resolve(speaker), segment)
+
+    def speakerMerged(self,merged:str,survivor:str):
+        #diarize thread: the registry folded `merged` into `survivor`, relabel segments already emitted
+        with self.relabel_lock:
+            rows = [i for i, speaker in enumerate(self.speaker_index.speakers) if speaker == merged]
+            if not rows:
+                return
+            live = {s.seq: s for s in self.final_segments}
+            for i in rows:
+                seq = self.speaker_index.seqs[i]
+                self.setSpeaker(seq, survivor, live.get(seq))
+
+    def setSpeaker(self,seq:int,speaker:str,segment:sh.Segment=None):
+        #relabel one segment everywhere it is kept and re-emit its line, caller holds relabel_lock
+        #(segment = the retained Segment if the caller has it, else the line is rebuilt from the index + words)
+        row = self.speaker_index.row(seq)
+        if row < 0: #cleared since
+            return
+        self.speaker_index.speakers[row] = speaker
+        self.words.setSpeaker(seq, speaker)
+        if self.journal is not None:
+            self.journal.speaker(seq, speaker)
+        if segment is not None:
+            segment.speaker = speaker
+            line = segment.line()
+        else:
+            line = self.speaker_index.line(row, self.words.segmentText(seq))
+        self.speaker_ready.emit(seq, line)
+
+    def rediarize(self)->int:
+        #offline pass over every segment of the session (not just the retained history), re-emits changed lines
+        if self.diarize is None:
+            return 0
+        index = self.speaker_index
+        with self.relabel_lock:
+            rows = [i for i, key in enumerate(index.keys) if key is not None]
+            seqs = [index.seqs[i] for i in rows]
+            keys = [index.keys[i] for i in rows]
+            labels = [index.speakers[i] for i in rows]
+        relabelled = self.speaker_pool.submit(self.diarize.relabel, keys, labels).result()
+        changed = 0
+        with self.relabel_lock:
+            live = {s.seq: s for s in self.final_segments}
+            for seq, old, label in zip(seqs, labels, relabelled):
+                if label != old:
+                    changed += 1
+                    self.setSpeaker(seq, label, live.get(seq))
+        print(f"[INFO] re-diarization changed {changed} of {len(seqs)} speaker labels")
+        self.rediarized.emit(changed)
+        return changed
+
+    def lines(self)->list:
+        #"[ts] speaker: text" of every segment of the session with its current speaker, oldest first
+        with self.relabel_lock:
+            live = {s.seq: s.line() for s in self.final_segments}
+            index = self.speaker_index
+            return [live.get(seq) or index.line(row, self.words.segmentText(seq)) for row, seq in enumerate(index.seqs)]
+
+    def clearSession(self):
+        #GUI clear: forget the transcript kept in memory, the journal continues in a new session file
+        #(under the lock, so a segment is either in the old session or in the new one, never split)
+        with self.relabel_lock:
+            self.final_segments.clear()
+            self.speaker_index.clear()
+            self.words.clear()
+            if self.journal is not None:
+                self.journal.rotate()
+
+    def stop(self):
+        #wake run() out of its blocking wait so it sees the flag
+        self.running = False
+        if hasattr(self.mic, "wakeup"):
+            self.mic.wakeup()
 
 
 # as the QaudioSource always deliver bytes even silence frame it just no working
 
     def run(self):
-        float_buf = collections.deque()                 # store audio frames
-        buf_samples = 0                                 # num of samples in buffer
+        float_buf = ab.AudioRingBuffer(self.max_samples)   # store audio samples of the current utterance
+        recent = ab.AudioRingBuffer(2 * self.cfg_file["sample_rate"])   # all recent audio, speech starts are found after the fact
+        stream_pos = None                               # stream sample clock, taken from frame timestamps
+        cursor = 0                                      # stream sample up to which speech is in float_buf
+        self.executor.start()
 
         in_speech = False                               # track if we're currently in speech
-        last_speech_ts = time.time()                    # timestamp of last detected speech
-        last_flush_ts = time.time()                     # timestamp for partial flush
+        last_frame_ts = time.monotonic()                # arrival time of the last frame
+        last_flush_ts = time.monotonic()                # timestamp for partial flush
 
         # while self.running:
         #     frame = self.mic.getFrame()
@@ -150,83 +415,73 @@ class ParakeetAsrWorker(QObject):
         #             last_flush_ts = time.time()
 
         while self.running:
-            frame = self.mic.getFrame()
-
-            # Handle mic silence (no frame yet)
+            # sleep until a frame arrives; only an open utterance needs a deadline,
+            # in case audio stops mid-speech (the VAD ends speech on the sample clock otherwise)
+            timeout = None
+            if in_speech:
+                timeout = max(0.0, last_frame_ts + self.audio_gap_sec - time.monotonic())
+            frame = self.mic.getFrame(timeout)
+
+            # Handle mic silence (no frame in time, or woken up by stop())
             if frame is None:
-                time.sleep(0.01)
-                # flush after longer silence timeout
-                if in_speech and (time.time() - last_speech_ts) > 0.6:
-                    result = self.flushTotext(float_buf, force=True)
-
-                    if isinstance(result, tuple):
-                        text, speaker, ts = result
-                        if text and text.strip():
-                            self.final_segments.append((ts, speaker, text.strip() + " "))
-                            self.trimHistoryToBudget()
-                            self.stable.emit(f"[{ts}] {speaker}: {text.strip()}")
-                            print(f"[DEBUG] stable emitted (no-frame): {text.strip()}")
+                if in_speech and (time.monotonic() - last_frame_ts) >= self.audio_gap_sec:
+                    self.submit(float_buf, final=True)
                     float_buf.clear()
-                    buf_samples = 0
+                    self.vad.endSpeech()
                     in_speech = False
-                    self.current_partial = ""
                 continue
 
-            # Convert frame
-            talking = self.vad.isSpeech(frame)
-            block_int16 = np.frombuffer(frame, dtype=np.int16)
-            block_float = block_int16.astype(np.float32) / 32767.0
-
-            # noise control future extensions of optional selection depending on bg noise
-            energy = np.mean(np.abs(block_float))
-            silence = energy < 0.012
-
+            last_frame_ts = time.monotonic()
 
-            if talking and not silence:
-                in_speech = True
-                last_speech_ts = time.time()
-
-                float_buf.append(block_float)
-                buf_samples += block_float.size
+            # First frame, dropped frames or restarted capture: restart the clocks at this frame
+            if frame.start != stream_pos:
+                if in_speech:
+                    self.submit(float_buf, final=True)
+                    float_buf.clear()
+                    in_speech = False
+                recent.clear(origin=frame.start)
+                self.vad.reset(frame.start)
+                self.stream_epoch = time.time() - (frame.start + frame.size) / self.cfg_file["sample_rate"]   #frame just arrived
+
+            # Frame already carries both views, converted once in the streamer
+            block_int16 = frame.int16
+            block_float = frame.float32
+            recent.append(block_float)
+            stream_pos = recent.end
+
+            # VAD speech starts/ends on the sample clock, a start can lie in an earlier block
+            for sample, is_start in self.vad.process(block_int16):
+                if is_start:
+                    in_speech = True
+                    float_buf.clear(origin=sample)
+                    self.speech_start = sample
+                    cursor = sample
+                elif in_speech: #End of speech, hangover audio already buffered is cut off again
+                    self.appendSpeech(float_buf, recent, cursor, sample)
+                    float_buf.trimAfter(sample)
+                    self.submit(float_buf, final=True)
+                    in_speech = False
+                    float_buf.clear()
+                    last_flush_ts = time.monotonic()
 
-                #Trim buffer if too big
-                if buf_samples > self.max_samples:
-                    while buf_samples > self.keep_left and float_buf:
-                        left = float_buf.popleft()
-                        buf_samples -= left.size
+            if in_speech:
+                self.appendSpeech(float_buf, recent, cursor, stream_pos)
+                cursor = stream_pos
 
-                # Periodic partial flush
-                if (time.time() - last_flush_ts) > self.cfg_file["partial_refresh_sec"] \
-                    or (len(float_buf) * self.block_ms / 1000.0) >= self.chunk_max_sec:
+                # Periodic partial flush (streaming cost is bounded, no need to flush on buffer length)
+                if (time.monotonic() - last_flush_ts) > self.cfg_file["partial_refresh_sec"] \
+                    or (self.decoder is None and (len(float_buf) / self.cfg_file["sample_rate"]) >= self.chunk_max_sec):
                     
-                    result = self.flushTotext(float_buf, force=False)
-
-                    if isinstance(result, tuple):
-                        text, speaker, ts = result
-                        if text and text.strip():
-                            self.current_partial = text
-                            self.partial.emit(f"[{ts}] {speaker}: {text}")
-                            print(f"[DEBUG] partial emitted: {text}")
-                            last_flush_ts = time.time()
-
-            #End of speech
-            else:
-
-                if in_speech and (time.time() - last_speech_ts) > 0.3:
-                    result = self.flushTotext(float_buf, force=True)
-                    if isinstance(result, tuple):
-                        text, speaker, ts = result
-                        if text and text.strip():
-                            self.final_segments.append((ts, speaker, text.strip() + " "))
-                            self.trimHistoryToBudget()
-                            self.stable.emit(f"[{ts}] {speaker}: {text.strip()}")
-                            print(f"[DEBUG] stable emitted: {text.strip()}")
+                    self.submit(float_buf, final=False)
+                    last_flush_ts = time.monotonic()
 
-                    in_speech = False
-                    float_buf.clear()
-                    buf_samples = 0
-                    self.current_partial = ""
-                    last_flush_ts = time.time()
+            frame.release()        #samples now live in the ring buffers, recycle the frame
+
+        self.executor.stop()
+        if self.models_ready.is_set():
+            self.speaker_pool.submit(lambda: None).result()     # backfilled speakers still pending are in too
+        if self.rediarize_on_stop and self.models_ready.is_set():
+            self.rediarize()
 
 
 
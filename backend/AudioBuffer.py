@@ -0,0 +1,68 @@
+#Audio Buffer = fixed capacity float32 ring buffer for the utterance being decoded
+import numpy as np
+
+
+class AudioRingBuffer:
+    # every sample is stored twice (at i and i + capacity) so the live region is
+    # always one contiguous slice: append/trim are O(block)/O(1) and view() never copies
+    def __init__(self,capacity:int):
+        self.capacity = int(capacity)
+        self.storage = np.zeros(2 * self.capacity, dtype=np.float32)
+        self.clear()
+
+    def clear(self,origin:int=0):
+        self.head = 0                   # storage index of the oldest sample
+        self.size = 0                   # number of samples held
+        self.start = int(origin)        # absolute sample index of the oldest sample
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    @property
+    def end(self)->int:
+        #absolute sample index one past the newest sample
+        return self.start + self.size
+
+    def append(self,block:np.ndarray):
+        k = block.size
+        if k >= self.capacity: #block alone fills the buffer, keep its newest samples
+            self.trimTo(0)
+            block = block[k - self.capacity:]
+            self.start += k - self.capacity
+            k = self.capacity
+        elif self.size + k > self.capacity: #overwrite the oldest samples
+            self.trimTo(self.capacity - k)
+
+        w = (self.head + self.size) % self.capacity
+        self.storage[w:w + k] = block
+
+        #mirror the written span into the other half
+        split = min(w + k, self.capacity)
+        if w < split:
+            self.storage[w + self.capacity:split + self.capacity] = self.storage[w:split]
+        if w + k > self.capacity:
+            self.storage[0:w + k - self.capacity] = self.storage[self.capacity:w + k]
+        self.size += k
+
+    def trimTo(self,keep:int):
+        #keep only the newest `keep` samples
+        drop = self.size - max(0, int(keep))
+        if drop > 0:
+            self.head = (self.head + drop) % self.capacity
+            self.size -= drop
+            self.start += drop
+
+    def trimBefore(self,abs_index:int):
+        #drop samples older than absolute sample `abs_index`
+        self.trimTo(self.end - abs_index)
+
+    def trimAfter(self,abs_index:int):
+        #drop samples at or after absolute sample `abs_index`
+        self.size = max(0, min(self.size, int(abs_index) - self.start))
+
+    def view(self)->np.ndarray:
+        #zero-copy contiguous view, only valid until the next append
+        return self.storage[self.head:self.head + self.size]
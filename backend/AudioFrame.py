@@ -0,0 +1,86 @@
+#Audio Frame = one captured block, converted once and recycled through a pool
+import collections
+import numpy as np
+
+
+class AudioFrame:
+    __slots__ = ("pool", "pcm", "pcm_f32", "size", "start", "rms_value", "has_float")
+
+    def __init__(self,pool,capacity:int):
+        self.pool = pool
+        self.pcm = np.empty(capacity, dtype=np.int16)           # pooled int16 storage
+        self.pcm_f32 = np.empty(capacity, dtype=np.float32)     # pooled float32 storage, filled on demand
+        self.size = 0
+        self.start = 0                                          # stream sample index of the first sample
+        self.rms_value = None
+        self.has_float = False
+
+    def clear(self,start:int=0):
+        self.size = 0
+        self.start = start
+        self.rms_value = None
+        self.has_float = False
+
+    def extend(self,pcm:np.ndarray)->int:
+        #append as much of pcm as fits, return number of samples taken
+        n = min(self.pcm.size - self.size, pcm.size)
+        self.pcm[self.size:self.size + n] = pcm[:n]
+        self.size += n
+        self.rms_value = None
+        self.has_float = False
+        return n
+
+    @property
+    def full(self)->bool:
+        return self.size == self.pcm.size
+
+    @property
+    def int16(self)->np.ndarray:
+        return self.pcm[:self.size]
+
+    @property
+    def float32(self)->np.ndarray:
+        #lazy int16 -> float32 in [-1, 1), converted at most once per frame
+        if not self.has_float:
+            np.multiply(self.int16, 1.0 / 32768.0, out=self.pcm_f32[:self.size], casting="unsafe")
+            self.has_float = True
+        return self.pcm_f32[:self.size]
+
+    @property
+    def rms(self)->float:
+        if self.rms_value is None:
+            x = self.float32
+            self.rms_value = float(np.sqrt(np.dot(x, x) / x.size)) if x.size else 0.0
+        return self.rms_value
+
+    def release(self):
+        #views taken from this frame are invalid afterwards
+        if self.pool is not None:
+            self.pool.release(self)
+
+
+class FramePool:
+    # preallocated frames, acquire() on the capture thread / release() on the consumer thread
+    # (deque append/pop are atomic, no lock needed)
+    def __init__(self,frame_samples:int,count:int):
+        self.frame_samples = frame_samples
+        self.free = collections.deque(AudioFrame(self, frame_samples) for _ in range(count))
+        self.allocated = count                                  # grows only if consumers hold frames too long
+
+    def take(self,start:int=0)->AudioFrame:
+        #empty frame starting at stream sample `start`
+        try:
+            frame = self.free.pop()
+        except IndexError:
+            frame = AudioFrame(self, self.frame_samples)
+            self.allocated += 1
+        frame.clear(start)
+        return frame
+
+    def acquire(self,pcm:np.ndarray,start:int=0)->AudioFrame:
+        frame = self.take(start)
+        frame.extend(pcm)
+        return frame
+
+    def release(self,frame:AudioFrame):
+        self.free.append(frame)
@@ -25,7 +25,7 @@ class ConsoleUi:
     def run(self):
         with Live(refresh_per_second=self.refresh_rate,console=self.console) as live:
             while self.running:
-                stable = "\n".join(f"[{ts}] {speaker}: {text}" for ts,speaker,text in self.asr_worker.final_segments)
+                stable = "\n".join(segment.line() for segment in self.asr_worker.final_segments)
                 partial = self.asr_worker.current_partial
 
                 
@@ -1,32 +1,385 @@
-from resemblyzer import VoiceEncoder
+import os
 import numpy as np
 
+from . import StartupReport as sr
+
+UNKNOWN_SPEAKER = "Speaker ?"
+
+class UtteranceEmbedding:
+    #running sum of Resemblyzer partial embeddings over one utterance, every sample is embedded once
+    def __init__(self,encoder,sample_rate=16000,min_chunk_sec=1.6):
+        self.encoder = encoder
+        self.min_chunk = int(min_chunk_sec * sample_rate)      # one Resemblyzer partial window
+        self.reset()
+
+    def reset(self):
+        self.total = None                                       # sum of partial embeddings
+        self.count = 0                                          # number of partial embeddings
+        self.until = 0                                          # stream sample embedded up to
+        self.partials = []                                      # partial embeddings per update, for turn detection
+        self.bounds = []                                        # [start, stop) stream samples of every partial
+
+    def update(self,samples:np.ndarray,origin:int=0,final=False):
+        # samples = utterance audio starting at stream sample `origin`
+        start = max(self.until, origin)
+        chunk = samples[start - origin:]
+        if chunk.size == 0 or (not final and chunk.size < self.min_chunk):
+            return
+        if self.count and chunk.size < self.min_chunk // 2: #short tail would only dilute the mean
+            return
+        _, partials, slices = self.encoder.embed_utterance(chunk, return_partials=True)
+        self.total = partials.sum(axis=0) if self.total is None else self.total + partials.sum(axis=0)
+        self.count += len(partials)
+        self.partials.append(partials)
+        self.bounds.extend((start + s.start, start + min(s.stop, chunk.size)) for s in slices)
+        self.until = origin + samples.size
+
+    def embedding(self):
+        if not self.count:
+            return None
+        raw = self.total / self.count
+        return raw / np.linalg.norm(raw, 2)
+
+    def windows(self):
+        # -> (partials (n, dim), bounds (n, 2)) over the whole utterance so far
+        if not self.count:
+            return None, None
+        return np.vstack(self.partials), np.asarray(self.bounds, dtype=np.int64)
+
+
+def changePoints(partials:np.ndarray,bounds:np.ndarray,threshold:float,min_turn:int,start:int,end:int)->list:
+    #speaker changes inside one utterance, as sorted sample positions
+    # compare each partial window with the next one that does not overlap it: low cosine = new voice
+    if len(partials) < 3:
+        return []
+    gap = max(1, int(np.searchsorted(bounds[:, 0], bounds[0, 1])))
+    if gap >= len(partials):
+        return []
+    sims = np.einsum("ij,ij->i", partials[:-gap], partials[gap:])
+    where = (bounds[:-gap, 1] + bounds[gap:, 0]) // 2          # between the two windows
+
+    cuts = []
+    for i in np.argsort(sims): #most dissimilar first, keep turns at least min_turn long
+        if sims[i] >= threshold:
+            break
+        pos = int(where[i])
+        if pos - start < min_turn or end - pos < min_turn:
+            continue
+        if all(abs(pos - c) >= min_turn for c in cuts):
+            cuts.append(pos)
+    return sorted(cuts)
+
+
+class SpeakerRegistry:
+    # rows [0, n) of a preallocated matrix hold the unit-norm centroid of each known speaker,
+    # lookup is one mat-vec product over at most max_speakers rows however long the session runs
+    def __init__(self,threshold:float,max_speakers:int=8,merge_threshold:float=0.85,namer=None):
+        self.threshold = threshold                              # cosine similarity threshold for same speaker
+        self.namer = namer                                      # embedding -> enrolled name or None, for new speakers
+        self.max_speakers = max_speakers
+        self.merge_threshold = merge_threshold                  # centroids this close are the same voice
+        self.centroids = None                                   # (max_speakers, dim) unit-norm running means
+        self.sums = None                                        # (max_speakers, dim) sum of member embeddings
+        self.counts = np.zeros(max_speakers, dtype=np.int64)    # embeddings per speaker
+        self.created = np.zeros(max_speakers, dtype=np.int64)   # creation order of row i, rows move on remove()
+        self.speaker_id = []                                    # label of row i
+        self.aliases = {}                                       # merged label -> surviving label
+        self.on_merge = None                                    # callable(merged, survivor), on the diarize thread
+        self.n = 0
+        self.next_id = 1                                        #counter for assigning new speaker
+        self.next_row = 0                                       # creation counter for self.created
+        self.full_warned = False
+
+    def __len__(self):
+        return self.n
+
+    def scores(self,embedding:np.ndarray)->np.ndarray:
+        if self.n == 0:
+            return np.empty(0, dtype=np.float32)
+        return self.centroids[:self.n] @ embedding
+
+    def match(self,embedding:np.ndarray):
+        #best known speaker above threshold, or None - never registers a speaker
+        scores = self.scores(embedding)
+        if scores.size == 0:
+            return None
+        best = int(np.argmax(scores))
+        return self.speaker_id[best] if scores[best] > self.threshold else None
+
+    def assign(self,embedding:np.ndarray)->str:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.centroids is None:
+            self.centroids = np.zeros((self.max_speakers, embedding.size), dtype=np.float32)
+            self.sums = np.zeros((self.max_speakers, embedding.size), dtype=np.float64)
+
+        scores = self.scores(embedding)
+        best = int(np.argmax(scores)) if scores.size else -1
+        if best < 0 or scores[best] <= self.threshold:
+            name = self.namer(embedding) if self.namer is not None else None
+            if name is not None and name in self.speaker_id: #enrolled voice already seen this session
+                best = self.speaker_id.index(name)
+            elif self.n < self.max_speakers: #first or new speaker detected
+                best = self.n
+                self.n += 1
+                if name is None:
+                    name = f"Speaker {self.next_id}"
+                    self.next_id += 1
+                self.aliases.pop(name, None)    # enrolled voice merged away earlier is back on its own
+                self.speaker_id.append(name)
+                self.created[best] = self.next_row
+                self.next_row += 1
+            elif not self.full_warned:
+                print(f"[WARN] speaker registry full ({self.max_speakers}), using closest speaker from now on")
+                self.full_warned = True
+
+        self.update(best, embedding)
+        return self.merge(best)
+
+    def update(self,row:int,embedding:np.ndarray):
+        #running mean, the centroid follows the speaker instead of freezing on the first utterance
+        self.sums[row] += embedding
+        self.counts[row] += 1
+        norm = np.linalg.norm(self.sums[row])
+        if norm > 0:
+            self.centroids[row] = self.sums[row] / norm
+
+    def merge(self,row:int)->str:
+        #fold near-duplicates of `row` into the oldest of them, returns the surviving label
+        scores = self.scores(self.centroids[row])
+        scores[row] = -np.inf
+        dup = np.flatnonzero(scores > self.merge_threshold)
+        if dup.size == 0:
+            return self.speaker_id[row]
+
+        rows = dup.tolist() + [row]
+        keep = min(rows, key=lambda r: self.created[r])     # oldest speaker survives
+        survivor = self.speaker_id[keep]
+        merged = []
+        for j in sorted(set(rows) - {keep}, reverse=True): #highest row first, remove() only moves the last row
+            self.sums[keep] += self.sums[j]
+            self.counts[keep] += self.counts[j]
+            merged.append(self.speaker_id[j])
+            self.remove(j)
+            if keep == self.n: #the survivor was the last row and just moved into j
+                keep = j
+        self.centroids[keep] = self.sums[keep] / np.linalg.norm(self.sums[keep])
+        for label in merged:
+            self.aliases[label] = survivor
+            for old in [k for k, v in self.aliases.items() if v == label]: #keep aliases one hop deep
+                self.aliases[old] = survivor
+            print(f"[INFO] merged {label} into {survivor}")
+            if self.on_merge is not None:
+                self.on_merge(label, survivor)
+        return survivor
+
+    def remove(self,row:int):
+        #swap the last row into `row`, O(dim)
+        last = self.n - 1
+        if row != last:
+            self.centroids[row] = self.centroids[last]
+            self.sums[row] = self.sums[last]
+            self.counts[row] = self.counts[last]
+            self.created[row] = self.created[last]
+            self.speaker_id[row] = self.speaker_id[last]
+        self.sums[last] = 0
+        self.counts[last] = 0
+        self.speaker_id.pop()
+        self.n = last
+
+    def resolve(self,speaker:str)->str:
+        #current label of a speaker that may have been merged since
+        while speaker in self.aliases:
+            speaker = self.aliases[speaker]
+        return speaker
+
+
+def averageLinkage(embeddings:np.ndarray)->list:
+    #average-linkage agglomerative clustering on cosine distance with the nearest-neighbour chain,
+    # O(n^2) time/memory and one vectorized row update per merge -> [(a, b, distance)] in merge order
+    n = len(embeddings)
+    if n < 2:
+        return []
+    dist = 1.0 - (embeddings @ embeddings.T).astype(np.float32)
+    np.fill_diagonal(dist, np.inf)
+    size = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    merges = []
+    chain = []
+    for _ in range(n - 1):
+        if not chain: #any live cluster starts a new chain
+            chain.append(int(np.argmax(active)))
+        while True: #follow nearest neighbours until two clusters are each other's nearest
+            a = chain[-1]
+            b = int(np.argmin(dist[a]))
+            if len(chain) > 1 and dist[a, chain[-2]] <= dist[a, b]:
+                b = chain[-2]
+            if len(chain) > 1 and b == chain[-2]:
+                break
+            chain.append(b)
+        chain.pop()
+        chain.pop()
+        merges.append((a, b, float(dist[a, b])))
+
+        #Lance-Williams update for average linkage, cluster b is folded into a
+        row = (size[a] * dist[a] + size[b] * dist[b]) / (size[a] + size[b])
+        dist[a] = row
+        dist[:, a] = row
+        dist[a, a] = np.inf
+        dist[b] = np.inf
+        dist[:, b] = np.inf
+        size[a] += size[b]
+        active[b] = False
+    return merges
+
+
+def cutMerges(n:int,merges:list,threshold:float)->np.ndarray:
+    #flat clusters at distance `threshold`: union every merge below it (average linkage is monotone)
+    parent = np.arange(n)
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    for a, b, d in sorted(merges, key=lambda m: m[2]):
+        if d > threshold:
+            break
+        parent[find(b)] = find(a)
+    return np.array([find(i) for i in range(n)])
+
+
 class DiarizationUtil:
     def __init__(self,cfg_file):
-        self.encoder = VoiceEncoder()                           # pretrained voice encoder (Resemblyzer)
-        self.embedding = []                                     # list of speaker embedding for detected speaker 
-        self.speaker_id = []                                    # list of speaker ids
-        self.threshold = cfg_file["speaker_threshold"]          # cosine similarity threshold for same speaker
-        self.next_id = 1                                        #counter for assigning new speaker 
-    
+        if cfg_file.get("encoder", "resemblyzer") == "onnx": #same network exported to ONNX, no torch
+            from . import SpeakerEncoder as se
+            self.encoder = se.OnnxVoiceEncoder(cfg_file)
+        else:
+            resemblyzer = sr.lazyImport("resemblyzer", "diarize")   # pulls in torch, only import when needed
+            self.encoder = resemblyzer.VoiceEncoder()               # pretrained voice encoder (Resemblyzer)
+        self.store = None                                       # enrolled speakers from earlier sessions
+        if cfg_file.get("enroll_dir") and os.path.exists(cfg_file["enroll_dir"]):
+            from . import SpeakerStore as ss
+            self.store = ss.SpeakerStore(cfg_file["enroll_dir"])
+        namer = None
+        if self.store is not None and len(self.store):
+            enroll_threshold = cfg_file.get("enroll_threshold", cfg_file["speaker_threshold"])
+            namer = lambda embedding: self.store.identify(embedding, enroll_threshold)
+        self.registry = SpeakerRegistry(
+            cfg_file["speaker_threshold"],
+            cfg_file.get("max_speakers", 8),
+            cfg_file.get("merge_threshold", 0.85),
+            namer,
+        )
+        self.utterance = UtteranceEmbedding(self.encoder)       # embedding cache of the utterance in progress
+        self.recluster_threshold = cfg_file.get("recluster_threshold", 1.0 - cfg_file["speaker_threshold"])   # average cosine distance cut
+        self.segment_emb = np.zeros((0, 0), dtype=np.float32)  # embedding of every committed segment, for relabel()
+        self.segment_rows = {}                                  # segment key -> row of segment_emb
+        self.change_threshold = cfg_file.get("change_threshold", 0.6)                 # partial-to-partial cosine below this = speaker change
+        self.min_turn = int(cfg_file.get("min_turn_sec", 1.0) * 16000)                 # shortest sub-segment split off
+
     def identify(self, audio_data: np.ndarray)->str:
-        embedding = self.encoder.embed_utterance(audio_data) #compute embedding for audio data 
-
-        if not self.embedding: #first speaker detected - list empty 
-            #add data of first speaker
-            self.embedding.append(embedding)
-            self.speaker_id.append(f"Speaker {self.next_id}")
-            self.next_id += 1
-            return self.speaker_id[-1]
-        
-        #compute cosine similarity
-        cal_lst = [np.dot(embedding, e) for e in self.embedding]
-        best_idx = int(np.argmax(cal_lst))
-        if cal_lst[best_idx] > self.threshold: #find best index within threashold
-            return self.speaker_id[best_idx]
-        
-        else: #if new speaker been detected 
-            self.embedding.append(embedding)
-            self.speaker_id.append(f"Speaker {self.next_id}")
-            self.next_id += 1  
-            return self.speaker_id[-1]
\ No newline at end of file
+        embedding = self.encoder.embed_utterance(audio_data) #compute embedding for audio data
+        return self.assign(embedding)
+
+    def match(self, embedding: np.ndarray):
+        return self.registry.match(embedding)
+
+    def assign(self, embedding: np.ndarray)->str:
+        return self.registry.assign(embedding)
+
+    def peek(self, audio_data: np.ndarray, origin: int = 0)->str:
+        #partial refresh: embed only audio not seen yet this utterance, no assignment
+        self.utterance.update(audio_data, origin)
+        embedding = self.utterance.embedding()
+        speaker = self.match(embedding) if embedding is not None else None
+        return speaker or UNKNOWN_SPEAKER
+
+    def commit(self, audio_data: np.ndarray, origin: int = 0, key=None)->str:
+        #end of utterance: finish the cached embedding and commit the speaker assignment
+        self.utterance.update(audio_data, origin, final=True)
+        embedding = self.utterance.embedding()
+        self.utterance.reset()
+        if embedding is None:
+            return UNKNOWN_SPEAKER
+        self.remember(key, embedding)
+        return self.assign(embedding)
+
+    def commitTurns(self, audio_data: np.ndarray, origin: int = 0, key=None)->list:
+        #end of utterance split at speaker changes -> [(start, end, speaker)] in stream samples
+        end = origin + audio_data.size
+        self.utterance.update(audio_data, origin, final=True)
+        partials, bounds = self.utterance.windows()
+        if partials is None:
+            self.utterance.reset()
+            return [(origin, end, UNKNOWN_SPEAKER)]
+        cuts = changePoints(partials, bounds, self.change_threshold, self.min_turn, origin, end)
+        if not cuts:
+            return [(origin, end, self.commit(audio_data, origin, None if key is None else (key, 0)))]
+        self.utterance.reset()
+
+        turns = []
+        centers = bounds.mean(axis=1)
+        edges = [origin] + cuts + [end]
+        for a, b in zip(edges, edges[1:]):
+            inside = (centers >= a) & (centers < b)
+            if not inside.any(): #no window centred here, use the closest one
+                inside = np.abs(centers - (a + b) / 2) == np.abs(centers - (a + b) / 2).min()
+            raw = partials[inside].mean(axis=0)
+            speaker = self.assign(raw / np.linalg.norm(raw, 2))
+            if turns and turns[-1][2] == speaker: #same voice on both sides, undo the cut
+                turns[-1] = (turns[-1][0], b, speaker)
+            else:
+                turns.append((a, b, speaker))
+
+        if key is not None:
+            for i, (a, b, _) in enumerate(turns):
+                raw = partials[(centers >= a) & (centers < b)].sum(axis=0)
+                if np.any(raw):
+                    self.remember((key, i), raw / np.linalg.norm(raw, 2))
+        return turns
+
+    # Session re-diarization ===============================================================
+    def remember(self, key, embedding: np.ndarray):
+        if key is None:
+            return
+        row = len(self.segment_rows)
+        if row == len(self.segment_emb): #grow by doubling, amortized O(1) per segment
+            grown = np.zeros((max(64, 2 * row), embedding.size), dtype=np.float32)
+            if row:
+                grown[:row] = self.segment_emb[:row]
+            self.segment_emb = grown
+        self.segment_emb[row] = embedding
+        self.segment_rows[key] = row
+
+    def relabel(self, keys: list, labels: list)->list:
+        #cluster all remembered segment embeddings of the session at once and name every cluster after
+        # the label most of its segments already carry; segments without an embedding keep theirs
+        known = [i for i, k in enumerate(keys) if k in self.segment_rows]
+        if len(known) < 2:
+            return list(labels)
+        emb = self.segment_emb[[self.segment_rows[keys[i]] for i in known]]
+        clusters = cutMerges(len(known), averageLinkage(emb), self.recluster_threshold)
+
+        members = {}
+        for i, c in zip(known, clusters):
+            members.setdefault(c, []).append(i)
+        names, taken = {}, set()
+        for c in sorted(members, key=lambda c: -len(members[c])): #largest cluster picks first
+            votes = {}
+            for i in members[c]:
+                if labels[i] != UNKNOWN_SPEAKER:
+                    votes[labels[i]] = votes.get(labels[i], 0) + 1
+            free = [l for l in sorted(votes, key=lambda l: -votes[l]) if l not in taken]
+            if free:
+                names[c] = free[0]
+            else:
+                names[c] = f"Speaker {self.registry.next_id}"
+                self.registry.next_id += 1
+            taken.add(names[c])
+
+        result = list(labels)
+        for i, c in zip(known, clusters):
+            result[i] = names[c]
+        return result
+
+    def resetUtterance(self):
+        self.utterance.reset()
@@ -0,0 +1,112 @@
+#Inference Executor = runs ASR/diarization off the capture + VAD loop
+import collections
+import threading
+import numpy as np
+
+
+class InferenceJob:
+    __slots__ = ("final", "utterance", "samples", "origin", "start")
+
+    def __init__(self,final:bool,utterance:int,samples:np.ndarray,origin:int=0,start=None):
+        self.final = final              # True = end of utterance, False = partial refresh
+        self.utterance = utterance      # utterance counter, partials of a finished utterance are stale
+        self.samples = samples          # private copy of the utterance audio, the ring buffer keeps moving
+        self.origin = origin            # stream sample of samples[0], later than start once the buffer was trimmed
+        self.start = origin if start is None else start     # stream sample where the utterance began
+
+
+class InferenceExecutor:
+    # queue policy:
+    #   partial -> single latest-wins slot, a newer partial supersedes an unprocessed one
+    #   final   -> FIFO bounded by max_pending, never blocks the caller; on overflow
+    #              "drop_oldest" discards the oldest queued final, "drop_newest" the incoming one
+    # jobs run on one thread, so results reach the UI in submission order
+    # ready (optional threading.Event) holds jobs back until the models are loaded
+    def __init__(self,handler,cfg_file,ready=None):
+        self.handler = handler
+        self.ready = ready
+        self.max_pending = int(cfg_file.get("max_pending_segments", 8))
+        self.overflow = cfg_file.get("overflow_policy", "drop_oldest")
+
+        self.cond = threading.Condition()
+        self.finals = collections.deque()
+        self.partial = None
+        self.dropped = 0                # finals lost to overflow
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._loop, name="inference", daemon=True)
+        self.thread.start()
+
+    def stop(self,wait=True):
+        #queued finals are still processed, pending partials are dropped
+        with self.cond:
+            self.running = False
+            self.partial = None
+            self.cond.notify_all()
+        if wait and self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def submitPartial(self,job:InferenceJob):
+        with self.cond:
+            self.partial = job
+            self.cond.notify()
+
+    def submitFinal(self,job:InferenceJob)->bool:
+        with self.cond:
+            if self.partial is not None and self.partial.utterance == job.utterance:
+                self.partial = None         # stale once its utterance is final
+            if len(self.finals) >= self.max_pending:
+                self.dropped += 1
+                print(f"[WARN] inference queue full ({self.max_pending}), {self.overflow}")
+                if self.overflow == "drop_newest":
+                    return False
+                self.finals.popleft()
+            self.finals.append(job)
+            self.cond.notify()
+            return True
+
+    def pending(self)->int:
+        with self.cond:
+            return len(self.finals) + (self.partial is not None)
+
+    def _next(self):
+        with self.cond:
+            while self.running and not self.finals and self.partial is None:
+                self.cond.wait()
+            if self.finals: #finals first: a queued final always precedes any newer partial
+                return self.finals.popleft()
+            if not self.running:
+                return None
+            job, self.partial = self.partial, None
+            return job
+
+    def _waitReady(self)->bool:
+        if self.ready is None:
+            return True
+        while not self.ready.wait(0.1):
+            if not self.running:
+                return False
+        return True
+
+    def _loop(self):
+        if not self._waitReady():
+            with self.cond:
+                if self.finals:
+                    print(f"[WARN] stopped before models were ready, {len(self.finals)} segment(s) not transcribed")
+                self.finals.clear()
+            return
+        while True:
+            job = self._next()
+            if job is None: #stopped and drained
+                return
+            try:
+                self.handler(job)
+            except Exception as e:
+                print(f"[ERROR] inference job failed: {e}")
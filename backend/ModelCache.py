@@ -0,0 +1,171 @@
+#Model Cache = fetch the Parakeet ONNX files once and keep graph-optimized copies
+#usage: python -m backend.ModelCache --fetch --build [--mirror /path/to/mirror] [--config config.yaml]
+import os
+import sys
+import json
+import shutil
+import fnmatch
+import hashlib
+import platform
+import argparse
+from pathlib import Path
+
+import yaml
+
+from . import OrtUtils as ou
+
+MANIFEST = "manifest.json"
+SESSION_KEYS = ("providers", "intra_op_threads", "inter_op_threads", "graph_optimization", "cpu_mem_arena", "execution_mode")
+
+
+def sha256(path:Path)->str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelCache:
+    def __init__(self,cfg_file):
+        self.cfg_file = cfg_file
+        self.model_name = cfg_file["model_name"]
+        self.model_dir = Path(cfg_file["model_dir"])
+        self.cache_dir = Path(cfg_file.get("cache_dir", self.model_dir / "cache"))
+        self.mirror_dir = Path(cfg_file["mirror_dir"]) if cfg_file.get("mirror_dir") else None
+        self.repo_id = cfg_file.get("repo_id", "istupakov/parakeet-tdt-0.6b-v3-onnx")
+        self.verify_mode = cfg_file.get("cache_verify", "quick")      # quick = size+mtime, full = sha256 every start
+
+        suffix = f".{cfg_file['quantization']}" if cfg_file.get("quantization") else ""
+        self.graphs = [f"encoder-model{suffix}.onnx", f"decoder_joint-model{suffix}.onnx"]
+        self.extras = ["config.json", "vocab.txt"]
+
+    # Raw files ===============================================================
+    def patterns(self)->list:
+        return self.extras + [g + "*" for g in self.graphs]       # "*" picks up external .onnx.data
+
+    def missing(self)->list:
+        return [g for g in self.graphs + self.extras if not (self.model_dir / g).exists()]
+
+    def fetch(self,offline=False):
+        #raw ONNX files into model_dir: from the local mirror if set, else Hugging Face
+        if not self.missing():
+            return
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        if self.mirror_dir is not None:
+            for src in self.mirror_dir.iterdir():
+                if any(fnmatch.fnmatch(src.name, p) for p in self.patterns()):
+                    dst = self.model_dir / src.name
+                    if not dst.exists() or dst.stat().st_size != src.stat().st_size:
+                        shutil.copy2(src, dst)
+        elif offline:
+            raise FileNotFoundError(f"model files missing in {self.model_dir} and no mirror_dir set: {self.missing()}")
+        else:
+            from huggingface_hub import snapshot_download
+            snapshot_download(self.repo_id, local_dir=str(self.model_dir), allow_patterns=self.patterns())
+        if self.missing():
+            raise FileNotFoundError(f"model files still missing in {self.model_dir}: {self.missing()}")
+
+    # Optimized artifacts ===============================================================
+    def key(self)->str:
+        #everything the optimized graph depends on
+        ident = {
+            "model": self.model_name,
+            "quantization": self.cfg_file.get("quantization"),
+            "onnxruntime": ou.ort().__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "session": {k: self.cfg_file.get(k) for k in SESSION_KEYS},
+            "sources": {g: (self.model_dir / g).stat().st_size for g in self.graphs if (self.model_dir / g).exists()},
+        }
+        return hashlib.sha256(json.dumps(ident, sort_keys=True).encode()).hexdigest()[:16]
+
+    def entryDir(self)->Path:
+        return self.cache_dir / f"{self.model_name}-{self.key()}"
+
+    def verify(self,entry:Path)->bool:
+        manifest = entry / MANIFEST
+        if not manifest.exists():
+            return False
+        files = json.loads(manifest.read_text())["files"]
+        for name, meta in files.items():
+            path = entry / name
+            if not path.exists() or path.stat().st_size != meta["size"]:
+                return False
+            if self.verify_mode == "full" or path.stat().st_mtime_ns != meta["mtime_ns"]:
+                if sha256(path) != meta["sha256"]:
+                    print(f"[WARN] model cache checksum mismatch: {path}")
+                    return False
+        return True
+
+    def build(self)->Path:
+        #optimize every graph once with the configured session options, write into a temp dir, publish by rename
+        entry = self.entryDir()
+        tmp = entry.with_name(entry.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        for graph in self.graphs:
+            opts = ou.sessionOptions(self.cfg_file)
+            opts.optimized_model_filepath = str(tmp / graph)
+            #weights > 2 GB cannot live inside one protobuf, keep them as external data like the source
+            opts.add_session_config_entry("session.optimized_model_external_initializers_file_name", graph + ".data")
+            opts.add_session_config_entry("session.optimized_model_external_initializers_min_size_in_bytes", "1024")
+            ou.ort().InferenceSession(str(self.model_dir / graph), sess_options=opts, providers=ou.providers(self.cfg_file))
+        for extra in self.extras:
+            shutil.copy2(self.model_dir / extra, tmp / extra)
+
+        files = {}
+        for path in tmp.iterdir():
+            files[path.name] = {"size": path.stat().st_size, "mtime_ns": path.stat().st_mtime_ns, "sha256": sha256(path)}
+        (tmp / MANIFEST).write_text(json.dumps({"model": self.model_name, "key": self.key(), "files": files}, indent=2))
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        return entry
+
+    def prepare(self,offline=None):
+        # -> (model_dir, SessionOptions) for onnx_asr.load_model
+        if offline is None:
+            offline = self.mirror_dir is not None or os.environ.get("HF_HUB_OFFLINE") == "1"
+        self.fetch(offline=offline)
+
+        entry = self.entryDir()
+        if not self.verify(entry):
+            print(f"[INFO] building optimized model cache in {entry}")
+            try:
+                entry = self.build()
+            except Exception as e:
+                print(f"[WARN] model cache build failed, loading raw model: {e}")
+                return str(self.model_dir), ou.sessionOptions(self.cfg_file)
+
+        #graph is already optimized for this runtime/options, skip re-optimizing it on every start
+        opts = ou.sessionOptions(dict(self.cfg_file, graph_optimization="disable"))
+        return str(entry), opts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch Parakeet ONNX files and build the optimized model cache")
+    parser.add_argument("--config", default=str(Path(__file__).parent.parent / "config.yaml"))
+    parser.add_argument("--fetch", action="store_true", help="download (or copy from --mirror) the raw model files")
+    parser.add_argument("--build", action="store_true", help="build + verify the optimized artifacts")
+    parser.add_argument("--mirror", help="local mirror directory, no network access")
+    parser.add_argument("--offline", action="store_true", help="never touch the network")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r") as f:
+        cfg = yaml.safe_load(f)["asr"]
+    if args.mirror:
+        cfg["mirror_dir"] = args.mirror
+
+    cache = ModelCache(cfg)
+    offline = args.offline or cache.mirror_dir is not None
+    if args.fetch or not args.build:
+        cache.fetch(offline=offline)
+    if args.build:
+        model_dir, _ = cache.prepare(offline=offline)
+        print(f"[INFO] model cache ready: {model_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
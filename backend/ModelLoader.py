@@ -0,0 +1,37 @@
+#Model Loader = builds the ASR model and speaker encoder off the GUI thread
+import time
+
+from . import AsrModel as am
+from . import DiarizationUtil as du
+from . import StartupReport as sr
+
+from PySide6.QtCore import QObject, Signal
+
+
+class ModelLoader(QObject):
+    progress = Signal(str)          # status text for the UI
+    ready = Signal()                # models attached to the worker, transcription can run
+    failed = Signal(str)
+
+    def __init__(self,cfg,worker):
+        super().__init__()
+        self.cfg = cfg
+        self.worker = worker
+
+    def run(self):
+        #blocking, call on a background thread; the worker keeps buffering speech until attachModels()
+        try:
+            start = time.perf_counter()
+            self.progress.emit("Loading speech recognition model (1/2)...")
+            with sr.timed("asr", "init"):
+                asr_model = am.NvidiaParakeet(self.cfg["asr"])
+            self.progress.emit("Loading speaker encoder (2/2)...")
+            with sr.timed("diarize", "init"):
+                diarize = du.DiarizationUtil(self.cfg["diarize"])
+            self.worker.attachModels(asr_model, diarize)
+            print(f"[INFO] models loaded in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"[ERROR] model loading failed: {e}")
+            self.failed.emit(str(e))
+            return
+        self.ready.emit()
@@ -0,0 +1,32 @@
+#Ort Utils = onnxruntime session settings shared by every ONNX model in the app
+from . import StartupReport as sr
+
+OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+EXEC_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+def ort():
+    #onnxruntime is imported by the first session that needs it
+    return sr.lazyImport("onnxruntime", "onnxruntime")
+
+def sessionOptions(cfg_file):
+    # build SessionOptions from a config section, missing keys keep onnxruntime defaults
+    rt = ort()
+    opts = rt.SessionOptions()
+    opts.intra_op_num_threads = cfg_file.get("intra_op_threads", 0)        # 0 = one per physical core
+    opts.inter_op_num_threads = cfg_file.get("inter_op_threads", 0)        # only used in parallel mode
+    opts.graph_optimization_level = getattr(rt.GraphOptimizationLevel, OPT_LEVELS[cfg_file.get("graph_optimization", "all")])
+    opts.enable_cpu_mem_arena = cfg_file.get("cpu_mem_arena", True)
+    opts.execution_mode = getattr(rt.ExecutionMode, EXEC_MODES[cfg_file.get("execution_mode", "sequential")])
+    return opts
+
+def providers(cfg_file)->list:
+    return list(cfg_file.get("providers", ["CPUExecutionProvider"]))
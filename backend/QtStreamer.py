@@ -1,12 +1,13 @@
-from PySide6.QtMultimedia import QAudioSource, QAudioFormat, QMediaDevices
-from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtMultimedia import QAudioSource, QAudioFormat, QMediaDevices, QAudioDevice
+from PySide6.QtCore import QObject, Signal, Slot
 import numpy as np
 import queue
 
+from . import AudioFrame as af
+
 
 class QAudioStreamer(QObject):
 
-    frame_ready = Signal(np.ndarray)
     level_ready = Signal(float) # for UI volume level updates
 
     def __init__(self, cfg):
@@ -17,13 +18,22 @@ class QAudioStreamer(QObject):
         self.channel = cfg.get("channel", 1)
 
         self.queue = queue.Queue(maxsize=cfg["max_queue"])
-        self.queue_timeout = cfg["queue_timeout"]
+        # frames queued + one being filled + one being consumed + slack
+        self.pool = af.FramePool(self.block_samples, cfg["max_queue"] + 4)
+        self.dropped = 0                    # frames lost because the consumer fell behind
+
+        # accumulator: device chunks are cut into exact block_samples frames
+        self.pending = None                 # frame being filled
+        self.odd_byte = b""                 # half a sample left over from the last read
+        self.sample_clock = 0               # stream samples captured so far = frame timestamps
 
         self.audio_source = None
         self.io_device = None
-        self.timer = None
         self.running = False
 
+    # slots, so the GUI can queue start/stop into the mic thread with QMetaObject.invokeMethod
+    @Slot()
+    @Slot(QAudioDevice)
     def start(self, device=None):
         fmt = QAudioFormat()
         fmt.setSampleRate(self.sample_rate)
@@ -39,19 +49,22 @@ class QAudioStreamer(QObject):
         self.audio_source = QAudioSource(device, fmt)
         self.io_device = self.audio_source.start()
 
-        if not self.timer:
-            self.timer = QTimer(self)
-            self.timer.timeout.connect(self._read_audio)
-
-        self.timer.start(self.block_ms)
+        # the device tells us when data is there, no polling timer
+        self.io_device.readyRead.connect(self._read_audio)
         self.running = True
         print(f"[INFO] QAudioStreamer started on: {device.description()}")
 
+    @Slot()
     def stop(self):
         if self.audio_source:
             self.audio_source.stop()
-        if self.timer:
-            self.timer.stop()
+        self.io_device = None
+        if self.pending is not None:
+            # a partial frame never reaches the worker, its samples still count on the clock
+            self.sample_clock = self.pending.start + self.pending.size
+            self.pending.release()
+            self.pending = None
+        self.odd_byte = b""
         self.running = False
         print("[INFO] QAudioStreamer stopped.")
 
@@ -62,25 +75,46 @@ class QAudioStreamer(QObject):
         if data.size() == 0:
             return
 
-        pcm_bytes = data.data()
-        pcm = np.frombuffer(pcm_bytes, dtype=np.int16)
-        pcm_f32 = pcm.astype(np.float32) / 32768.0
-
+        raw = self.odd_byte + data.data()
+        self.odd_byte = raw[len(raw) & ~1:]
+        pcm = np.frombuffer(raw, dtype=np.int16, count=len(raw) // 2)
+
+        # fill pooled frames, emit each one as soon as it holds exactly block_samples
+        pos = 0
+        while pos < pcm.size:
+            if self.pending is None:
+                self.pending = self.pool.take(self.sample_clock)
+            taken = self.pending.extend(pcm[pos:])
+            pos += taken
+            self.sample_clock += taken
+            if self.pending.full:
+                frame, self.pending = self.pending, None
+                self._emit(frame)
+
+    def _emit(self, frame):
         # compute RMS for UI
-        rms = np.sqrt(np.mean(np.square(pcm_f32))) if pcm_f32.size else 0.0
-        self.level_ready.emit(rms)
-        print(f"back emit {rms}")
+        rms = frame.rms
+        self.level_ready.emit(rms)          # coalesced to the refresh rate on the GUI side
 
 
         # ASR Queue
         try:
-            self.queue.put_nowait(pcm_bytes)
-            self.frame_ready.emit(pcm_f32)
+            self.queue.put_nowait(frame)
         except queue.Full:
-            pass
+            frame.release()
+            self.dropped += 1
+            print(f"[WARN] audio queue full, {self.dropped} frames dropped")
 
-    def getFrame(self):
+    def getFrame(self, timeout=None):
+        # blocks until a frame arrives (no polling); None after `timeout` seconds or on wakeup()
         try:
-            return self.queue.get(timeout=self.queue_timeout)
+            return self.queue.get(timeout=timeout)
         except queue.Empty:
             return None
+
+    def wakeup(self):
+        # unblock a consumer waiting in getFrame()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass        # consumer has frames to wake up on anyway
@@ -0,0 +1,92 @@
+#Segment History = finished transcript segments with running totals and bounded retention
+import bisect
+import collections
+from array import array
+
+
+class Segment:
+    __slots__ = ("seq", "ts", "speaker", "text", "start", "end", "key")
+
+    def __init__(self,seq:int,ts:str,speaker:str,text:str,start:int=0,end:int=0,key=None):
+        self.seq = seq                  # id shared with the UI line
+        self.ts = ts                    # wall clock HH:MM:SS at emission
+        self.speaker = speaker          # label, may be backfilled / relabelled later
+        self.text = text
+        self.start = start              # stream sample clock span of the audio
+        self.end = end
+        self.key = key                  # segment embedding key in DiarizationUtil, None = not reclusterable
+
+    def line(self)->str:
+        return f"[{self.ts}] {self.speaker}: {self.text}"
+
+
+class SegmentHistory:
+    # retention:
+    #   "time"  -> keep segments whose audio lies within the last max_sec of the stream
+    #   "chars" -> keep at most max_chars of text
+    # totals are updated on append/evict, so each append is O(1) amortized
+    # only what is kept in memory is bounded: speakers of evicted segments stay relabelable through SpeakerIndex
+    def __init__(self,cfg_file):
+        self.mode = cfg_file.get("history_mode", "time")
+        self.max_samples = int(cfg_file["max_history_sec"] * cfg_file["sample_rate"])
+        self.max_chars = int(cfg_file.get("max_history_chars", 20000))
+        self.segments = collections.deque()
+        self.chars = 0                  # running text length
+        self.samples = 0                # running audio length
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def append(self,segment:Segment):
+        self.segments.append(segment)
+        self.chars += len(segment.text)
+        self.samples += segment.end - segment.start
+        if self.mode == "chars":
+            while self.chars > self.max_chars and len(self.segments) > 1:
+                self.evict()
+        else:
+            while not 0 <= segment.end - self.segments[0].start <= self.max_samples and len(self.segments) > 1:
+                self.evict()        #negative span = segment from an earlier stream clock (recovered session)
+
+    def evict(self):
+        old = self.segments.popleft()
+        self.chars -= len(old.text)
+        self.samples -= old.end - old.start
+
+    def clear(self):
+        self.segments.clear()
+        self.chars = 0
+        self.samples = 0
+
+
+class SpeakerIndex:
+    # speaker label + embedding key of every segment of the session, never evicted:
+    # re-diarization and speaker merges relabel segments the bounded history has already dropped
+    # (text stays in the WordTimeline, only what a relabelled line needs on top of it is kept here)
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.seqs = array("q")          # increasing, searched with bisect
+        self.ts = []
+        self.speakers = []
+        self.keys = []
+
+    def __len__(self):
+        return len(self.seqs)
+
+    def append(self,segment:Segment):
+        self.seqs.append(segment.seq)
+        self.ts.append(segment.ts)
+        self.speakers.append(segment.speaker)
+        self.keys.append(segment.key)
+
+    def row(self,seq:int)->int:
+        i = bisect.bisect_left(self.seqs, seq)
+        return i if i < len(self.seqs) and self.seqs[i] == seq else -1
+
+    def line(self,row:int,text:str)->str:
+        return f"[{self.ts[row]}] {self.speakers[row]}: {text}"
@@ -0,0 +1,130 @@
+#Speaker Encoder = Resemblyzer's voice encoder run through onnxruntime, no torch at runtime
+#export once: python -m backend.SpeakerEncoder --export ./models/voice_encoder.onnx   (needs resemblyzer + torch)
+import sys
+import argparse
+import numpy as np
+
+from . import OrtUtils as ou
+
+#Resemblyzer hparams
+SAMPLE_RATE = 16000
+N_FFT = 400                     # 25 ms window
+HOP = 160                       # 10 ms step
+N_MELS = 40
+PARTIAL_FRAMES = 160            # 1.6 s per partial embedding
+
+
+def hzToMel(f):
+    #slaney scale: linear below 1 kHz, logarithmic above (librosa htk=False)
+    f = np.asarray(f, dtype=np.float64)
+    mel = f / (200.0 / 3)
+    logstep = np.log(6.4) / 27.0
+    return np.where(f >= 1000.0, 15.0 + np.log(np.maximum(f, 1e-10) / 1000.0) / logstep, mel)
+
+
+def melToHz(m):
+    m = np.asarray(m, dtype=np.float64)
+    logstep = np.log(6.4) / 27.0
+    return np.where(m >= 15.0, 1000.0 * np.exp(logstep * (m - 15.0)), m * (200.0 / 3))
+
+
+def melFilterbank(sr=SAMPLE_RATE,n_fft=N_FFT,n_mels=N_MELS)->np.ndarray:
+    # (n_mels, n_fft//2 + 1) triangles with slaney area normalization, same as librosa.filters.mel
+    fft_freqs = np.linspace(0, sr / 2, n_fft // 2 + 1)
+    mel_f = melToHz(np.linspace(hzToMel(0.0), hzToMel(sr / 2), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None]
+    return weights.astype(np.float32)
+
+
+MEL_BASIS = melFilterbank()
+WINDOW = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)).astype(np.float32)   # periodic hann
+
+
+def melSpectrogram(wav:np.ndarray)->np.ndarray:
+    # (frames, 40) power mel spectrogram, centred frames with reflect padding like librosa < 0.10
+    wav = np.pad(wav.astype(np.float32, copy=False), N_FFT // 2, mode="reflect")
+    frames = np.lib.stride_tricks.sliding_window_view(wav, N_FFT)[::HOP] * WINDOW
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    return (power.astype(np.float32) @ MEL_BASIS.T)
+
+
+def partialSlices(n_samples:int,rate=1.3,min_coverage=0.75):
+    #same windows as resemblyzer.VoiceEncoder.compute_partial_slices
+    n_frames = int(np.ceil((n_samples + 1) / HOP))
+    frame_step = int(np.round((SAMPLE_RATE / rate) / HOP))
+    steps = max(1, n_frames - PARTIAL_FRAMES + frame_step + 1)
+    mel_slices = [slice(i, i + PARTIAL_FRAMES) for i in range(0, steps, frame_step)]
+    wav_slices = [slice(s.start * HOP, s.stop * HOP) for s in mel_slices]
+
+    last = wav_slices[-1]
+    coverage = (n_samples - last.start) / (last.stop - last.start)
+    if coverage < min_coverage and len(mel_slices) > 1:
+        mel_slices, wav_slices = mel_slices[:-1], wav_slices[:-1]
+    return wav_slices, mel_slices
+
+
+class OnnxVoiceEncoder:
+    #drop-in for resemblyzer.VoiceEncoder.embed_utterance
+    def __init__(self,cfg_file):
+        ort = ou.ort()
+        opts = ou.sessionOptions({"intra_op_threads": 1, "inter_op_threads": 1, **cfg_file})   #leave the cores to the ASR model
+        self.session = ort.InferenceSession(cfg_file["encoder_path"], sess_options=opts, providers=ou.providers(cfg_file))
+        self.input_name = self.session.get_inputs()[0].name
+
+    def embedPartials(self,mels:np.ndarray)->np.ndarray:
+        # (n, 160, 40) -> (n, 256) unit-norm embeddings, one run for all windows
+        return self.session.run(None, {self.input_name: mels.astype(np.float32, copy=False)})[0]
+
+    def embed_utterance(self,wav:np.ndarray,return_partials=False,rate=1.3,min_coverage=0.75):
+        wav_slices, mel_slices = partialSlices(len(wav), rate, min_coverage)
+        if wav_slices[-1].stop >= len(wav):
+            wav = np.pad(wav, (0, wav_slices[-1].stop - len(wav)), "constant")
+
+        mel = melSpectrogram(wav)
+        partials = self.embedPartials(np.stack([mel[s] for s in mel_slices]))
+        raw = partials.mean(axis=0)
+        embed = raw / np.linalg.norm(raw, 2)
+        if return_partials:
+            return embed, partials, wav_slices
+        return embed
+
+
+def export(path:str,check=True):
+    #trace the pretrained torch encoder once, mels (batch, frames, 40) -> embeds (batch, 256)
+    import torch
+    from resemblyzer import VoiceEncoder
+
+    encoder = VoiceEncoder("cpu")
+    encoder.eval()
+    dummy = torch.zeros(1, PARTIAL_FRAMES, N_MELS)
+    torch.onnx.export(
+        encoder, dummy, path,
+        input_names=["mels"], output_names=["embeds"],
+        dynamic_axes={"mels": {0: "batch", 1: "frames"}, "embeds": {0: "batch"}},
+        opset_version=17,
+    )
+    print(f"[INFO] speaker encoder exported to {path}")
+
+    if check: #same audio through both paths, front end included
+        wav = np.random.default_rng(0).normal(0, 0.05, 5 * SAMPLE_RATE).astype(np.float32)
+        _, ref, _ = encoder.embed_utterance(wav, return_partials=True)
+        _, got, _ = OnnxVoiceEncoder({"encoder_path": path}).embed_utterance(wav, return_partials=True)
+        cos = np.sum(ref * got, axis=1)
+        print(f"[INFO] torch vs onnx partial embeddings: min cosine {cos.min():.5f} over {len(cos)} windows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the Resemblyzer voice encoder to ONNX")
+    parser.add_argument("--export", default="./models/voice_encoder.onnx", help="output .onnx path")
+    parser.add_argument("--no-check", action="store_true", help="skip the torch vs onnx comparison")
+    args = parser.parse_args(argv)
+    export(args.export, check=not args.no_check)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
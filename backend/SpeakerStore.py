@@ -0,0 +1,105 @@
+#Speaker Store = enrolled voices on disk, float16 embeddings memory-mapped at startup
+#enroll: python -m backend.SpeakerStore enroll --name Alice alice1.wav alice2.wav [--config config.yaml]
+#list:   python -m backend.SpeakerStore list
+# <store_dir>/embeddings.f16  append-only rows of unit-norm float16 embeddings
+# <store_dir>/names.json      row -> speaker name, a person may own several rows
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import yaml
+import numpy as np
+
+DIM = 256                       # Resemblyzer embedding size
+CHUNK = 16384                   # rows scored per step, bounds the float32 scratch to 16 MB
+
+
+class SpeakerStore:
+    def __init__(self,store_dir,dim=DIM):
+        self.dir = Path(store_dir)
+        self.dim = dim
+        self.emb_path = self.dir / "embeddings.f16"
+        self.names_path = self.dir / "names.json"
+        self.load()
+
+    def load(self):
+        #memmap, nothing is read until scored, so thousands of voices load instantly
+        self.names = json.loads(self.names_path.read_text(encoding="utf-8")) if self.names_path.exists() else []
+        rows = self.emb_path.stat().st_size // (2 * self.dim) if self.emb_path.exists() else 0
+        rows = min(rows, len(self.names))       # rows appended without a name (interrupted enroll) are ignored
+        self.names = self.names[:rows]
+        self.matrix = np.memmap(self.emb_path, dtype=np.float16, mode="r", shape=(rows, self.dim)) if rows else None
+
+    def __len__(self):
+        return len(self.names)
+
+    def topk(self,embedding:np.ndarray,k:int=1)->list:
+        # -> [(name, cosine)] best first; stored rows are unit-norm so a dot product is the cosine
+        if self.matrix is None:
+            return []
+        query = (embedding / np.linalg.norm(embedding)).astype(np.float32)
+        k = min(k, len(self))
+        best_idx = np.empty(0, dtype=np.int64)
+        best_score = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self), CHUNK):
+            scores = self.matrix[start:start + CHUNK].astype(np.float32) @ query
+            top = np.argpartition(scores, -min(k, scores.size))[-k:]
+            best_idx = np.concatenate([best_idx, top + start])
+            best_score = np.concatenate([best_score, scores[top]])
+            keep = np.argsort(best_score)[::-1][:k]
+            best_idx, best_score = best_idx[keep], best_score[keep]
+        return [(self.names[i], float(s)) for i, s in zip(best_idx, best_score)]
+
+    def identify(self,embedding:np.ndarray,threshold:float):
+        #enrolled name above threshold, or None
+        best = self.topk(embedding, 1)
+        return best[0][0] if best and best[0][1] > threshold else None
+
+    def enroll(self,name:str,embedding:np.ndarray):
+        #append the row first, then publish it through names.json (atomic replace)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        row = (embedding / np.linalg.norm(embedding)).astype(np.float16)
+        if row.size != self.dim:
+            raise ValueError(f"embedding has {row.size} dims, store expects {self.dim}")
+        with open(self.emb_path, "ab") as f:
+            f.write(row.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        names = self.names + [name]
+        tmp = self.names_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(names, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.names_path)
+        self.load()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enroll known speakers into the on-disk speaker store")
+    parser.add_argument("--config", default=str(Path(__file__).parent.parent / "config.yaml"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    enroll = sub.add_parser("enroll", help="embed WAV files and store them under a name")
+    enroll.add_argument("--name", required=True)
+    enroll.add_argument("wavs", nargs="+")
+    sub.add_parser("list", help="enrolled names and row counts")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r") as f:
+        cfg = yaml.safe_load(f)["diarize"]
+    store = SpeakerStore(cfg.get("enroll_dir", "./models/speakers"))
+
+    if args.command == "list":
+        for name in sorted(set(store.names)):
+            print(f"{name}: {store.names.count(name)}")
+        return
+
+    from . import DiarizationUtil as du
+    from .AsrBenchmark import readWav
+    encoder = du.DiarizationUtil(dict(cfg, enroll_dir=None)).encoder
+    for wav in args.wavs:
+        store.enroll(args.name, encoder.embed_utterance(readWav(wav)))
+        print(f"[INFO] enrolled {args.name} from {wav}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#Startup Report = import / init timing per backend component, printed with Main.py --startup-report
+import sys
+import time
+import importlib
+import threading
+
+T0 = time.perf_counter()        # first import of this module, Main.py imports it before anything heavy
+_rows = []                      # (component, phase, start_sec, seconds)
+_lock = threading.Lock()
+
+
+def record(component:str,phase:str,start:float,seconds:float):
+    with _lock:
+        _rows.append((component, phase, start - T0, seconds))
+
+
+class timed:
+    #with timed("asr", "init"): ...
+    def __init__(self,component:str,phase:str):
+        self.component = component
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self,*exc):
+        record(self.component, self.phase, self.start, time.perf_counter() - self.start)
+        return False
+
+
+def lazyImport(module:str,component:str):
+    #import a heavy dependency on first use and time it, later calls are a dict lookup
+    mod = sys.modules.get(module)
+    if mod is not None:
+        return mod
+    with timed(component, f"import {module}"):
+        return importlib.import_module(module)
+
+
+def report()->str:
+    #init rows include the lazy imports done inside them
+    with _lock:
+        rows = sorted(_rows, key=lambda r: r[2])
+    lines = [f"{'component':<12} {'phase':<24} {'at (s)':>8} {'took (s)':>9}"]
+    for component, phase, start, seconds in rows:
+        lines.append(f"{component:<12} {phase:<24} {start:>8.2f} {seconds:>9.2f}")
+    frozen = " (frozen)" if getattr(sys, "frozen", False) else ""
+    lines.append(f"total since start{frozen}: {time.perf_counter() - T0:.2f}s")
+    return "\n".join(lines)
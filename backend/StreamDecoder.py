@@ -0,0 +1,117 @@
+#Stream Decoder = incremental decoding of a growing utterance
+import collections
+import numpy as np
+
+
+def normWord(word:str)->str:
+    #compare words without case/punctuation so "Hello," agrees with "hello"
+    return word.strip().lower().strip(".,?!;:\"'")
+
+
+class LocalAgreement:
+    # LocalAgreement-n policy: a word is stable once the last n hypotheses agree on it
+    def __init__(self,n=2):
+        self.n = max(1, int(n))
+        self.history = collections.deque(maxlen=self.n)       # last n uncommitted hypotheses (normalized words)
+
+    def reset(self):
+        self.history.clear()
+
+    def insert(self,words:list)->int:
+        #add a hypothesis, return length of the prefix all n hypotheses agree on
+        self.history.append([normWord(w) for w in words])
+        if len(self.history) < self.n:
+            return 0
+        agreed = 0
+        for column in zip(*self.history):
+            if any(w != column[0] for w in column):
+                break
+            agreed += 1
+        return agreed
+
+    def consume(self,count:int):
+        #committed words leave every stored hypothesis
+        for i, hyp in enumerate(self.history):
+            self.history[i] = hyp[count:]
+
+
+class StreamingDecoder:
+    def __init__(self,asr_model,cfg_file):
+        self.asr_model = asr_model
+        self.sample_rate = cfg_file["sample_rate"]
+
+        self.context = int(cfg_file.get("stream_context_sec", 2) * self.sample_rate)     #left context re-decoded before the commit point
+        self.max_pending = int(cfg_file["chunk_max_sec"] * self.sample_rate)              #force a commit past this much uncommitted audio
+        self.tolerance = int(0.04 * self.sample_rate)                                     #half a TDT frame of timestamp jitter
+        self.policy = LocalAgreement(cfg_file.get("stream_agreement", 2))
+        self.reset()
+
+    def reset(self):
+        self.committed = []             # committed words of the current utterance [(word, start, end)]
+        self.tentative = []             # latest uncommitted words [(word, start, end)] on the stream sample clock
+        self.commit_sample = None       # stream sample where uncommitted audio starts, None = utterance not seen yet
+        self.policy.reset()
+
+    def anchor(self,origin:int):
+        #first audio of an utterance: nothing before its start is pending
+        if self.commit_sample is None:
+            self.commit_sample = origin
+
+    def keepFrom(self)->int:
+        #earliest stream sample the decoder still needs, anything before it can be trimmed
+        if self.commit_sample is None:
+            return 0
+        return max(0, self.commit_sample - self.context)
+
+    def text(self)->str:
+        return " ".join(w for w, _, _ in self.committed)
+
+    def _hypothesis(self,samples:np.ndarray,origin:int)->list:
+        #decode [commit - context, end) only, so cost is bounded by context + uncommitted audio
+        start = max(origin, self.keepFrom())
+        window = samples[start - origin:]
+        words = [(w, start + int(s * self.sample_rate), start + int(e * self.sample_rate))
+                 for w, s, e in self.asr_model.transcribeWords(window)]
+
+        #drop words that belong to the already committed context
+        words = [w for w in words if w[1] >= self.commit_sample - self.tolerance]
+        if words and self.committed and words[0][1] < self.commit_sample + self.tolerance \
+                and normWord(words[0][0]) == normWord(self.committed[-1][0]):
+            words = words[1:]
+        return words
+
+    def _commit(self,words:list,count:int):
+        if count > 0:
+            self.committed.extend(words[:count])
+            self.commit_sample = words[count][1] if count < len(words) else words[count - 1][2]
+            self.policy.consume(count)
+        self.tentative = words[count:]
+
+    def update(self,samples:np.ndarray,origin:int=0):
+        # samples = utterance audio starting at stream sample `origin`
+        # returns (stable_text, tentative_text)
+        self.anchor(origin)
+        end = origin + samples.size
+        words = self._hypothesis(samples, origin)
+        agreed = self.policy.insert([w for w, _, _ in words])
+
+        if end - self.commit_sample > self.max_pending:
+            if len(words) > 1:
+                agreed = max(agreed, len(words) - 1)     #keep only the last (possibly cut) word open
+            elif not words:
+                self.commit_sample = max(self.commit_sample, end - self.context)   #nothing recognised, stop re-decoding it
+
+        self._commit(words, agreed)
+        return self.text(), " ".join(w for w, _, _ in self.tentative)
+
+    def finalizeWords(self,samples:np.ndarray,origin:int=0)->list:
+        #end of utterance: decode the open tail once and commit everything, [(word, start, end)]
+        self.anchor(origin)
+        words = self._hypothesis(samples, origin)
+        self._commit(words, len(words))
+        words = self.committed
+        self.reset()
+        return words
+
+    def finalize(self,samples:np.ndarray,origin:int=0)->str:
+        return " ".join(w for w, _, _ in self.finalizeWords(samples, origin))
@@ -0,0 +1,179 @@
+#Transcript Journal = append-only JSONL record of the session, written by a background thread
+# {"type": "segment", "seq", "ts", "speaker", "text", "start", "end"}
+# {"type": "speaker", "seq", "speaker"}      later relabel of a segment (backfill / re-diarization)
+# {"type": "end"}                            clean shutdown, a journal without it is recovered on restart
+# "end" and the switch to a new file are done by the writer thread, in queue order: nothing lands after "end"
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from . import SegmentHistory as sh
+
+
+class TranscriptJournal:
+    def __init__(self,cfg_file):
+        self.dir = Path(cfg_file.get("journal_dir", "./sessions"))
+        self.fsync_sec = cfg_file.get("journal_fsync_sec", 1.0)     # at most this much is lost on power failure
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.file = None
+        self.count = 0                  # segments in the journal
+        self.recovered = []             # segments of an interrupted session, continued in the same file
+        self.open(self.unfinished())
+
+    # Session files ===============================================================
+    def unfinished(self):
+        #newest journal without an "end" record, or None
+        journals = sorted(self.dir.glob("session-*.jsonl"))
+        if not journals:
+            return None
+        last = None
+        for record in self.records(journals[-1]):
+            last = record
+        return journals[-1] if last is not None and last.get("type") != "end" else None
+
+    def records(self,path=None):
+        #stream records, a torn last line from a crash is skipped
+        with open(path or self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def segments(self,path=None):
+        #two passes so memory stays O(relabelled segments), not O(session)
+        speakers = {r["seq"]: r["speaker"] for r in self.records(path) if r.get("type") == "speaker"}
+        for r in self.records(path):
+            if r.get("type") == "segment":
+                yield sh.Segment(r["seq"], r["ts"], speakers.get(r["seq"], r["speaker"]), r["text"],
+                                 r.get("start", 0), r.get("end", 0))
+
+    def newPath(self)->Path:
+        return self.dir / f"session-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+
+    def open(self,path=None):
+        if path is not None:
+            self.dropTornLine(path)
+            self.recovered = list(self.segments(path))
+            self.count = len(self.recovered)
+            print(f"[INFO] recovered {self.count} segments from {path}")
+        else:
+            path = self.newPath()
+            self.recovered = []
+            self.count = 0
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._loop, name="journal", daemon=True)
+        self.thread.start()
+
+    def dropTornLine(self,path):
+        #a crash mid-write leaves a partial last line, cut it off before appending or the next record is glued to it
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(pos, 1 << 16)
+                f.seek(pos - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    pos = pos - step + newline + 1
+                    break
+                pos -= step
+            if pos < end:
+                print(f"[WARN] dropped {end - pos} bytes of a torn record at the end of {path}")
+                f.truncate(pos)
+
+    def close(self):
+        #clean end of session: the writer writes everything queued, then "end", fsyncs and exits
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def rotate(self):
+        #finish this session and start an empty one; records queued before go to the old file, after to the new one
+        self.recovered = []
+        self.count = 0
+        self.queue.put(self.newPath())
+
+    # Records ===============================================================
+    def append(self,segment:sh.Segment):
+        self.count += 1
+        self.queue.put({"type": "segment", "seq": segment.seq, "ts": segment.ts, "speaker": segment.speaker,
+                        "text": segment.text, "start": segment.start, "end": segment.end})
+
+    def speaker(self,seq:int,speaker:str):
+        self.queue.put({"type": "speaker", "seq": seq, "speaker": speaker})
+
+    def export(self,filename):
+        #plain text transcript streamed from the journal, waits for queued records first
+        self.sync()
+        with open(filename, "w", encoding="utf-8") as f:
+            for segment in self.segments():
+                f.write(segment.line() + "\n")
+
+    def sync(self):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    # Writer ===============================================================
+    def _loop(self):
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            timeout = max(0.0, last_sync + self.fsync_sec - time.monotonic()) if dirty else None
+            try:
+                batch = [self.queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while True: #drain everything already queued into one write
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif stop:
+                    print(f"[WARN] journal record after close dropped: {item}")
+                elif item is None or isinstance(item, Path): #end of session, close or rotate
+                    self.finish()
+                    dirty = False
+                    last_sync = time.monotonic()
+                    if item is None:
+                        stop = True
+                    else:
+                        self.path = item
+                        self.file = open(item, "a", encoding="utf-8")
+                else:
+                    self.file.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    dirty = True
+            if dirty or waiters:
+                self.file.flush()
+            if dirty and (waiters or time.monotonic() - last_sync >= self.fsync_sec):
+                os.fsync(self.file.fileno())
+                last_sync = time.monotonic()
+                dirty = False
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def finish(self):
+        #writer thread: "end" after everything queued before it, then the file is done
+        self.file.write(json.dumps({"type": "end"}) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
@@ -1,14 +1,229 @@
 #Vad Util = Voice Detection Utol
 import yaml
-import webrtcvad
+import numpy as np
+from abc import ABC, abstractmethod
+
+from . import StartupReport as sr
+
+class VadBackend(ABC):  #Uniform Interface for VAD backends
+    frame_ms = None     #allowed sub-frame lengths, None = any
+
+    @abstractmethod
+    def scoreFrames(self,frames:np.ndarray)->np.ndarray:
+        # frames: (n, frame_samples) int16 -> speech decision per frame
+        pass
+
+    def reset(self):
+        #forget stream state (stateful backends only)
+        pass
+
+
+class WebRtcVad(VadBackend):
+    frame_ms = (10, 20, 30) #webrtcvad rejects anything else
 
-class VadUtils:
     def __init__(self,cfg_file):
+        webrtcvad = sr.lazyImport("webrtcvad", "vad")
         self.vad = webrtcvad.Vad(cfg_file["aggressiveness"])
         self.sample_rate = cfg_file["sample_rate"]
 
+    def scoreFrames(self,frames:np.ndarray)->np.ndarray:
+        #the C API takes one frame per call
+        return np.fromiter((self.vad.is_speech(f.tobytes(), self.sample_rate) for f in frames),
+                           dtype=bool, count=len(frames))
+
+
+class EnergyVad(VadBackend):
+    # pure NumPy: frame energy above an adaptive noise floor and a speech-like (non flat) spectrum
+    def __init__(self,cfg_file):
+        self.sample_rate = cfg_file["sample_rate"]
+        self.snr_db = cfg_file.get("snr_db", 9.0)                   #dB above the noise floor
+        self.max_flatness = cfg_file.get("max_flatness", 0.45)      #spectral flatness of white noise = 1
+        self.rise_db = cfg_file.get("noise_rise_db", 0.05)          #noise floor may rise this much per frame
+        self.reset()
+
+    def reset(self):
+        self.noise_db = None
+
+    def scoreFrames(self,frames:np.ndarray)->np.ndarray:
+        x = frames.astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+
+        #noise floor = slowly rising minimum: floor_i = min(floor_-1 + r*(i+1), min_j<=i e_j + r*(i-j))
+        ramp = self.rise_db * np.arange(len(x))
+        floor = np.minimum.accumulate(energy_db - ramp) + ramp
+        if self.noise_db is not None:
+            floor = np.minimum(floor, self.noise_db + self.rise_db + ramp)
+        self.noise_db = float(floor[-1])
+
+        #spectral flatness over the speech band
+        spec = np.abs(np.fft.rfft(x * np.hanning(x.shape[1]), axis=1)) ** 2 + 1e-12
+        freqs = np.fft.rfftfreq(x.shape[1], 1.0 / self.sample_rate)
+        band = spec[:, (freqs >= 100) & (freqs <= 4000)]
+        flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+
+        return (energy_db > floor + self.snr_db) & (flatness < self.max_flatness)
+
+
+class OnnxVad(VadBackend):
+    # neural VAD through onnxruntime, e.g. Silero VAD (frame_ms: 32 = 512 samples at 16 kHz)
+    # stateless models score the whole batch in one run; recurrent models (a "state" input)
+    # cannot be batched over time, their state is threaded through the frames of the batch
+    def __init__(self,cfg_file):
+        ort = sr.lazyImport("onnxruntime", "vad") #optional, only needed for this backend
+        from . import OrtUtils as ou
+
+        #tiny model on the capture path: one thread, leave the cores to the ASR
+        opts = ou.sessionOptions({"intra_op_threads": 1, "inter_op_threads": 1, **cfg_file.get("onnx", {})})
+        self.session = ort.InferenceSession(cfg_file["model_path"], sess_options=opts,
+                                            providers=ou.providers(cfg_file.get("onnx", {})))
+        self.sample_rate = cfg_file["sample_rate"]
+        self.threshold = cfg_file.get("threshold", 0.5)
+
+        inputs = {i.name: i for i in self.session.get_inputs()}
+        self.input_name = next(n for n in inputs if n not in ("state", "sr"))
+        self.has_sr = "sr" in inputs
+        self.state_shape = [d if isinstance(d, int) else 1 for d in inputs["state"].shape] if "state" in inputs else None
+        self.context_samples = cfg_file.get("context_samples", 64 if self.state_shape else 0)   #Silero v5 prepends 64 samples
+        self.reset()
+
+    def reset(self):
+        self.state = np.zeros(self.state_shape, dtype=np.float32) if self.state_shape else None
+        self.context = np.zeros(self.context_samples, dtype=np.float32)
+
+    def scoreFrames(self,frames:np.ndarray)->np.ndarray:
+        x = frames.astype(np.float32) / 32768.0
+        if self.context_samples:
+            prev = np.vstack((self.context[None, :], x[:-1, -self.context_samples:]))
+            self.context = x[-1, -self.context_samples:].copy()
+            x = np.hstack((prev, x))
+
+        feeds = {}
+        if self.has_sr:
+            feeds["sr"] = np.array(self.sample_rate, dtype=np.int64)
+        if self.state is None:
+            feeds[self.input_name] = x
+            prob = self.session.run(None, feeds)[0]
+        else:
+            prob = np.empty(len(x), dtype=np.float32)
+            for i, frame in enumerate(x):
+                feeds[self.input_name] = frame[None, :]
+                feeds["state"] = self.state
+                out, self.state = self.session.run(None, feeds)[:2]
+                prob[i] = out.reshape(-1)[0]
+        return np.asarray(prob, dtype=np.float32).reshape(len(frames), -1)[:, 0] >= self.threshold
+
+
+BACKENDS = {"webrtc": WebRtcVad, "energy": EnergyVad, "onnx": OnnxVad}
+
+
+class VadUtils:
+    def __init__(self,cfg_file):
+        name = cfg_file.get("backend", "webrtc")
+        if name not in BACKENDS:
+            raise ValueError(f"unknown vad backend '{name}', expected one of {sorted(BACKENDS)}")
+        self.backend = BACKENDS[name](cfg_file)
+        self.sample_rate = cfg_file["sample_rate"]
+
+        #blocks are split into fixed sub-frames and scored as one batch per block
+        frame_ms = cfg_file.get("frame_ms", 20)
+        if self.backend.frame_ms is not None and frame_ms not in self.backend.frame_ms:
+            raise ValueError(f"vad backend '{name}' needs frame_ms in {self.backend.frame_ms}, got {frame_ms}")
+        self.frame_samples = self.sample_rate * frame_ms // 1000
+
+        self.onset = max(1, -(-cfg_file.get("onset_ms", 60) // frame_ms))     #consecutive speech frames that open speech
+        self.hangover = cfg_file.get("hangover_ms", 300) // frame_ms          #silent frames tolerated before speech ends
+        self.energy_floor = cfg_file.get("energy_floor", 0.0)                 #mean |x| below this is never speech
+        self.reset()
+
+    def reset(self,origin:int=0):
+        self.backend.reset()
+        self.origin = origin                        # stream sample of the first sub-frame
+        self.carry = np.zeros(0, dtype=np.int16)    # samples of an incomplete sub-frame
+        self.frames = 0                             # sub-frames processed = stream clock in frames
+        self.run = 0                                # trailing raw speech frames while not active
+        self.active = False                         # inside speech (incl. hangover)
+        self.last_speech = -1                       # last raw speech frame while active
+
+    def frameDecisions(self,frames:np.ndarray)->np.ndarray:
+        # frames: (n, frame_samples) int16 -> raw speech decision per sub-frame
+        speech = self.backend.scoreFrames(frames)
+        if self.energy_floor > 0:
+            energy = np.abs(frames.astype(np.float32)).mean(axis=1) / 32768.0
+            speech &= energy >= self.energy_floor
+        return speech
+
     def isSpeech(self,frame_bytes:bytes)->bool: #check if instance is speech 
-        try:
-            return self.vad.is_speech(frame_bytes,self.sample_rate)
-        except Exception:
-            return True
\ No newline at end of file
+        pcm = np.frombuffer(frame_bytes, dtype=np.int16)
+        n = pcm.size // self.frame_samples
+        if n == 0:
+            return False
+        return bool(self.frameDecisions(pcm[:n * self.frame_samples].reshape(n, -1)).any())
+
+    def process(self,block:np.ndarray)->list:
+        # feed the next int16 block of the stream
+        # returns [(stream_sample, is_start)]: speech starts/ends, sample accurate on the sub-frame grid
+        data = np.concatenate((self.carry, block)) if self.carry.size else block
+        n = data.size // self.frame_samples
+        self.carry = data[n * self.frame_samples:].copy()
+        if n == 0:
+            return []
+        raw = self.frameDecisions(data[:n * self.frame_samples].reshape(n, -1))
+        return [(self.origin + int(frame) * self.frame_samples, is_start) for frame, is_start in self.smooth(raw)]
+
+    def smooth(self,raw:np.ndarray)->list:
+        # onset/hangover smoothing of raw decisions, returns [(stream_frame, is_start)]
+        k, hang = self.onset, self.hangover
+        f0 = self.frames
+        f_end = f0 + raw.size
+        self.frames = f_end
+
+        #prepend carried state: last speech frame if active, else the trailing speech run
+        if self.active:
+            h0 = self.last_speech
+            hist = np.zeros(f0 - h0, dtype=bool)
+            hist[0] = True
+        else:
+            h0 = f0 - self.run
+            hist = np.ones(self.run, dtype=bool)
+        ext = np.concatenate((hist, raw))
+
+        idx = np.flatnonzero(ext)
+        if idx.size == 0:
+            self.run = 0
+            return []
+
+        #length of the speech run ending at each frame, a run of k confirms an onset
+        c = np.cumsum(ext)
+        run = c - np.maximum.accumulate(np.where(ext, 0, c))
+        confirmed = run >= k
+        if self.active:
+            confirmed[0] = True
+        conf_pos = np.flatnonzero(confirmed)
+
+        #speech frames closer than the hangover belong to one chain = one speech region
+        breaks = np.flatnonzero(np.diff(idx) > hang + 1)
+        firsts = np.r_[0, breaks + 1]
+        lasts = np.r_[breaks, idx.size - 1]
+
+        events = []
+        was_active = self.active
+        self.active = False
+        for i, (a, b) in enumerate(zip(idx[firsts], idx[lasts])):
+            j = np.searchsorted(conf_pos, a)
+            if j == conf_pos.size or conf_pos[j] > b: #onset never confirmed, noise blip
+                continue
+            if not (was_active and i == 0):
+                events.append((h0 + conf_pos[j] - k + 1, True))
+            if h0 + b + hang + 1 < f_end or i < len(firsts) - 1:
+                events.append((h0 + b + 1, False))          #ends with its last speech frame
+            else:
+                self.active = True
+                self.last_speech = h0 + b
+
+        self.run = 0 if self.active or not ext[-1] else int(run[-1])
+        return events
+
+    def endSpeech(self):
+        #caller closed the utterance itself (e.g. audio stopped), forget the open region
+        self.active = False
+        self.run = 0
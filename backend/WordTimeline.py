@@ -0,0 +1,114 @@
+#Word Timeline = word timings of the session on the stream sample clock, stored column-wise,
+#exported to SRT / WebVTT / JSON one cue at a time
+import json
+import bisect
+from array import array
+from pathlib import Path
+
+
+class WordTimeline:
+    def __init__(self,sample_rate=16000,max_cue_chars=42,max_cue_sec=5.0):
+        self.sample_rate = sample_rate
+        self.max_cue_chars = max_cue_chars          # caption line length
+        self.max_cue_samples = int(max_cue_sec * sample_rate)
+        self.clear()
+
+    def clear(self):
+        #word columns
+        self.word_start = array("q")                # stream sample of the word start
+        self.word_end = array("q")
+        self.text_end = array("q")                  # end offset of the word in self.text
+        self.text = bytearray()                     # utf-8 words back to back
+        #segment columns
+        self.seg_seq = array("q")                   # increasing, searched with bisect
+        self.seg_first = array("q")                 # index of the first word of the segment
+        self.seg_speaker = []
+
+    def __len__(self):
+        return len(self.word_start)
+
+    def append(self,seq:int,speaker:str,words:list):
+        # words = [(word, start_sample, end_sample)]
+        self.seg_seq.append(seq)
+        self.seg_first.append(len(self.word_start))
+        self.seg_speaker.append(speaker)
+        for w, s, e in words:
+            self.text += w.encode("utf-8")
+            self.text_end.append(len(self.text))
+            self.word_start.append(int(s))
+            self.word_end.append(int(e))
+
+    def setSpeaker(self,seq:int,speaker:str):
+        i = bisect.bisect_left(self.seg_seq, seq)
+        if i < len(self.seg_seq) and self.seg_seq[i] == seq:
+            self.seg_speaker[i] = speaker
+
+    def segmentText(self,seq:int)->str:
+        i = bisect.bisect_left(self.seg_seq, seq)
+        if i == len(self.seg_seq) or self.seg_seq[i] != seq:
+            return ""
+        last = self.seg_first[i + 1] if i + 1 < len(self.seg_seq) else len(self.word_start)
+        return " ".join(self.word(k)[0] for k in range(self.seg_first[i], last))
+
+    def word(self,i:int)->tuple:
+        start = self.text_end[i - 1] if i else 0
+        return self.text[start:self.text_end[i]].decode("utf-8"), self.word_start[i], self.word_end[i]
+
+    def segments(self):
+        #(seq, speaker, [(word, start, end)]) one segment at a time
+        n = len(self.seg_seq)
+        for k in range(n):
+            last = self.seg_first[k + 1] if k + 1 < n else len(self.word_start)
+            yield self.seg_seq[k], self.seg_speaker[k], [self.word(i) for i in range(self.seg_first[k], last)]
+
+    # Export ===============================================================
+    def cues(self):
+        #(start, end, speaker, text) caption cues, never longer than max_cue_chars / max_cue_sec, never across segments
+        for _, speaker, words in self.segments():
+            cue = []
+            for w in words:
+                if cue and (len(" ".join(x[0] for x in cue)) + 1 + len(w[0]) > self.max_cue_chars
+                            or w[2] - cue[0][1] > self.max_cue_samples):
+                    yield cue[0][1], cue[-1][2], speaker, " ".join(x[0] for x in cue)
+                    cue = []
+                cue.append(w)
+            if cue:
+                yield cue[0][1], cue[-1][2], speaker, " ".join(x[0] for x in cue)
+
+    def clock(self,sample:int,sep:str)->str:
+        ms = int(round(sample * 1000 / self.sample_rate))
+        h, ms = divmod(ms, 3600000)
+        m, ms = divmod(ms, 60000)
+        s, ms = divmod(ms, 1000)
+        return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+    def writeSrt(self,f):
+        for n, (start, end, speaker, text) in enumerate(self.cues(), 1):
+            f.write(f"{n}\n{self.clock(start, ',')} --> {self.clock(end, ',')}\n{speaker}: {text}\n\n")
+
+    def writeVtt(self,f):
+        f.write("WEBVTT\n\n")
+        for start, end, speaker, text in self.cues():
+            f.write(f"{self.clock(start, '.')} --> {self.clock(end, '.')}\n<v {speaker}>{text}\n\n")
+
+    def writeJson(self,f):
+        #one segment per line inside a JSON array, times in seconds on the session clock
+        f.write("[")
+        sep = "\n"
+        sr = self.sample_rate
+        for seq, speaker, words in self.segments():
+            item = {"seq": seq, "speaker": speaker,
+                    "start": words[0][1] / sr if words else None, "end": words[-1][2] / sr if words else None,
+                    "words": [{"word": w, "start": s / sr, "end": e / sr} for w, s, e in words]}
+            f.write(sep + json.dumps(item, ensure_ascii=False))
+            sep = ",\n"
+        f.write("\n]\n")
+
+    def export(self,filename):
+        #format from the extension: .srt / .vtt / .json
+        writers = {".srt": self.writeSrt, ".vtt": self.writeVtt, ".json": self.writeJson}
+        suffix = Path(filename).suffix.lower()
+        if suffix not in writers:
+            raise ValueError(f"unsupported caption format: {suffix}")
+        with open(filename, "w", encoding="utf-8") as f:
+            writers[suffix](f)
@@ -1,9 +1,7 @@
 #!/bin/bash
+# fetch the Parakeet ONNX files and build the optimized model cache (see asr: in config.yaml)
+# offline: ./export.sh --mirror /path/to/local/mirror
 
 pip install --upgrade huggingface_hub
 
-mkdir -p models/parakeet-tdt-0.6b-v3-onnx
-
-huggingface-cli download istupakov/parakeet-tdt-0.6b-v3-onnx \
-  --local-dir models/ \
-  --local-dir-use-symlinks False
\ No newline at end of file
+python -m backend.ModelCache --fetch --build "$@"
@@ -11,12 +11,12 @@ BASE_PATH = get_base_path()
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QComboBox, QPushButton, QTextEdit, QProgressBar, QGroupBox,
+    QComboBox, QPushButton, QListView, QProgressBar, QGroupBox, QAbstractItemView,
     QGridLayout, QFileDialog, QMessageBox
 )
-from PySide6.QtCore import Qt, QTimer, QThread, QMetaObject,Q_ARG, Slot
-from PySide6.QtGui import QTextCursor, QTextCharFormat, QFont, QColor, QShortcut, QKeySequence
-from PySide6.QtMultimedia import QMediaDevices, QAudioSource, QAudioFormat, QAudioDevice
+from PySide6.QtCore import Qt, QThread, QMetaObject,Q_ARG, Slot
+from PySide6.QtGui import QFont, QShortcut, QKeySequence
+from PySide6.QtMultimedia import QMediaDevices, QAudioDevice
 
 import threading
 import yaml
@@ -26,8 +26,10 @@ import os
 from backend.QtStreamer import QAudioStreamer as ms
 from backend import AsrWorker as aw
 from backend import VadUtils as vadu
-from backend import AsrModel as am
-from backend import DiarizationUtil as du
+from backend import ModelLoader as ml
+from backend import StartupReport as sr
+from gui.TranscriptModel import TranscriptModel
+from gui.UiScheduler import UiScheduler
 
 
 class MainWindow(QMainWindow):
@@ -41,13 +43,15 @@ class MainWindow(QMainWindow):
             config = yaml.safe_load(f)
 
         # === BACKEND ===
-        self.mic = ms(config["mic"])
-        self.asr_model = am.NvidiaParakeet(config["asr"])
-        self.vad = vadu.VadUtils(config["vad"])
-        self.diarize = du.DiarizationUtil(config["diarize"])
+        # ASR + speaker models load in the background, capture and VAD start right away
+        with sr.timed("mic", "init"):
+            self.mic = ms(config["mic"])
+        with sr.timed("vad", "init"):
+            self.vad = vadu.VadUtils(config["vad"])
         self.asr_worker = aw.ParakeetAsrWorker(
-            self.mic, self.asr_model, self.vad, self.diarize, config["asr_worker"]
+            self.mic, None, self.vad, None, config["asr_worker"]
         )
+        self.model_loader = ml.ModelLoader(config, self.asr_worker)
 
         # === BACKEND THREADS ===
         self.gui_thread = QThread.currentThread()
@@ -55,9 +59,6 @@ class MainWindow(QMainWindow):
         self.mic.moveToThread(self.mic_thread)
 
 
-        # Mic -> UI
-        self.mic.level_ready.connect(self.on_mic_level, Qt.QueuedConnection) 
-
         # Thread lifecycle
         self.mic_thread.started.connect(lambda: self.mic.start(QMediaDevices.defaultAudioInput()))
         self.mic_thread.finished.connect(self.mic.stop)
@@ -72,9 +73,23 @@ class MainWindow(QMainWindow):
         QShortcut(QKeySequence("Ctrl+X"), self, activated=self.clearTranscript)
 
         # === UI ===
-        self._partial_block_num = None
+        self.max_rows = config["ui"].get("max_rows", 5000)     # transcript scrollback, the journal keeps the rest
         self.setup_ui()
 
+        # Worker / Mic -> UI, coalesced to gui_refresh_hz
+        self.ui_scheduler = UiScheduler(
+            self.transcript_model, self.on_mic_level, self._followTail,
+            config["ui"].get("gui_refresh_hz", 30), self
+        )
+        self.mic.level_ready.connect(self.ui_scheduler.onLevel, Qt.QueuedConnection)
+
+        # interrupted session from the journal
+        journal = self.asr_worker.journal
+        if journal is not None and journal.recovered:
+            for segment in journal.recovered:
+                self.appendStable(segment.seq, segment.line())
+            print(f"[INFO] restored {len(journal.recovered)} segments of the interrupted session")
+
         # Device list
         self.media_devices = QMediaDevices()
         self.media_devices.audioInputsChanged.connect(self.populate_devices)
@@ -82,16 +97,24 @@ class MainWindow(QMainWindow):
 
         # Start mic thread (but mic.start() inside the thread)
         self.mic_thread.start()
-        self.statusBar().showMessage("Ready")
         self.asr_t = None
 
-    @Slot(float)
+        # Model loading -> UI
+        self.model_loader.progress.connect(self.statusBar().showMessage, Qt.QueuedConnection)
+        self.model_loader.ready.connect(self.onModelsReady, Qt.QueuedConnection)
+        self.model_loader.failed.connect(self.onModelsFailed, Qt.QueuedConnection)
+
+        # listen while loading, speech is transcribed once the models are attached
+        # (capture itself is started by the mic thread above)
+        self.startWorker()
+
+    def startLoading(self):
+        #called by main() after it connected its own model_loader slots, so none can miss ready / failed
+        threading.Thread(target=self.model_loader.run, name="model-loader", daemon=True).start()
+
     def on_mic_level(self, rms: float):
         self.volume_bar.setValue(int(min(100, rms * 100)))
 
-        # Debug print : mic_thread -> UI_thread in real-time
-        self.statusBar().showMessage(f"Mic RMS Level: {rms:.4f}")
-
 
 
 
@@ -158,9 +181,15 @@ class MainWindow(QMainWindow):
         # --- UI-Transcription-Output ---
         output_group = QGroupBox("Transcription Output")
         output_layout = QVBoxLayout(output_group)
-        self.transcript_display = QTextEdit()
+        self.transcript_model = TranscriptModel(self, self.max_rows)
+        self.transcript_display = QListView()
+        self.transcript_display.setModel(self.transcript_model)
         self.transcript_display.setFont(QFont("Consolas", 10))
-        self.transcript_display.setPlaceholderText("Transcription will appear here...")
+        self.transcript_display.setWordWrap(True)
+        self.transcript_display.setLayoutMode(QListView.Batched)         # lay out rows in batches, not all at once
+        self.transcript_display.setBatchSize(200)
+        self.transcript_display.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.transcript_display.setSelectionMode(QAbstractItemView.ExtendedSelection)
         output_layout.addWidget(self.transcript_display)
         main_layout.addWidget(output_group)
 
@@ -233,50 +262,80 @@ class MainWindow(QMainWindow):
 
     # Btn ===============================================================
     def startTranscription(self):
+        if self.asr_t and self.asr_t.is_alive():
+            return
+        if not self.mic.running: #QAudioStreamer lives in mic_thread, never start it from here
+            QMetaObject.invokeMethod(self.mic, "start", Qt.QueuedConnection)
+        self.startWorker()
+
+    def startWorker(self):
         if self.asr_t and self.asr_t.is_alive():
             return
         self.asr_worker.running = True
-        if not self.mic.running:
-            self.mic.start()
         self.asr_t = threading.Thread(target=self.asr_worker.run, daemon=True)
         self.asr_t.start()
 
         try:
             self.asr_worker.partial.disconnect()
             self.asr_worker.stable.disconnect()
+            self.asr_worker.speaker_ready.disconnect()
+            self.asr_worker.rediarized.disconnect()
         except Exception:
             pass
-        self.asr_worker.partial.connect(self.showPartial)
-        self.asr_worker.stable.connect(self.appendStable)
+        self.asr_worker.partial.connect(self.ui_scheduler.onPartial, Qt.QueuedConnection)
+        self.asr_worker.stable.connect(self.ui_scheduler.onStable, Qt.QueuedConnection)
+        self.asr_worker.speaker_ready.connect(self.ui_scheduler.onSpeaker, Qt.QueuedConnection)
+        self.asr_worker.rediarized.connect(self.onRediarized)
 
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
-        self.statusBar().showMessage("Transcribing...")
+        if self.asr_worker.models_ready.is_set():
+            self.statusBar().showMessage("Transcribing...")
 
     def stopTranscription(self):
-        if hasattr(self.asr_worker, "running"):
-            self.asr_worker.running = False
-        self.mic.stop()
-        self.start_button.setEnabled(True)
+        self.asr_worker.stop()
+        QMetaObject.invokeMethod(self.mic, "stop", Qt.QueuedConnection)
+        self.start_button.setEnabled(self.asr_worker.models_ready.is_set())
         self.stop_button.setEnabled(False)
         self.statusBar().showMessage("Stopped.")
 
+    @Slot()
+    def onModelsReady(self):
+        running = self.asr_t is not None and self.asr_t.is_alive()
+        self.start_button.setEnabled(not running)
+        self.statusBar().showMessage("Transcribing..." if running else "Ready")
+
+    @Slot(str)
+    def onModelsFailed(self, message: str):
+        self.start_button.setEnabled(False)
+        self.statusBar().showMessage("Model loading failed.")
+        QMessageBox.critical(self, "Error", f"Failed to load models:\n{message}")
+
 
     def saveText(self):
-        text = self.transcript_display.toPlainText().strip()
-        if not text:
+        running = self.asr_t is not None and self.asr_t.is_alive()
+        if not running and self.asr_worker.rediarize_on_stop and self.asr_worker.models_ready.is_set():
+            self.asr_worker.rediarize()      #relabels the worker's segments now, the view follows on a later tick
+        journal = self.asr_worker.journal
+        text = "\n".join(self.asr_worker.lines()).strip() if journal is None else ""   #not the view, it lags and is bounded
+        if not text and not (journal is not None and journal.count):
             QMessageBox.warning(self, "No Text", "There is no transcription to save.")
             return
         filename, _ = QFileDialog.getSaveFileName(
             self, "Save Transcript", os.path.expanduser("~/transcript.txt"),
-            "Text Files (*.txt);;All Files (*)"
+            "Text Files (*.txt);;SubRip Captions (*.srt);;WebVTT Captions (*.vtt);;JSON with word timings (*.json);;All Files (*)"
         )
         if not filename:
             self.statusBar().showMessage("Save cancelled.")
             return
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(text)
+            if os.path.splitext(filename)[1].lower() in (".srt", ".vtt", ".json"): #captions from the word timeline
+                self.asr_worker.words.export(filename)
+            elif journal is not None: #whole session, not just what is still in memory
+                journal.export(filename)
+            else:
+                with open(filename, "w", encoding="utf-8") as f:
+                    f.write(text)
             self.statusBar().showMessage(f"Transcript saved to: {filename}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save file:\n{str(e)}")
@@ -284,72 +343,41 @@ class MainWindow(QMainWindow):
     def toggleTranscription(self):
         if self.asr_t and self.asr_t.is_alive():
             self.stopTranscription()
-        else:
+        elif self.start_button.isEnabled():
             self.startTranscription()
 
     def clearTranscript(self):
-        self.transcript_display.clear()
-        self._partial_block_num = None
+        self.ui_scheduler.reset()
+        self.transcript_model.clear()
+        self.asr_worker.clearSession()     #cleared transcript starts a new session file
         self.statusBar().showMessage("Transcription cleared.")
 
     # Output Text ===============================================================
 
-    def showPartial(self, text: str):
-        fmt = QTextCharFormat()
-        fmt.setForeground(QColor("#808080"))
-        doc = self.transcript_display.document()
-        cursor = self.transcript_display.textCursor()
-        if self._partial_block_num is not None:
-            block = doc.findBlockByNumber(self._partial_block_num)
-            if block.isValid():
-                cursor.setPosition(block.position())
-                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
-                cursor.removeSelectedText()
-                cursor.mergeCharFormat(fmt)
-                cursor.insertText(text.strip())
-                block.setUserState(1)
-        else:
-            cursor.movePosition(QTextCursor.End)
-            cursor.mergeCharFormat(fmt)
-            cursor.insertText(text.strip())
-            block = cursor.block()
-            block.setUserState(1)
-            self._partial_block_num = block.blockNumber()
-        self.transcript_display.moveCursor(QTextCursor.End)
-
-    def appendStable(self, text: str):
-        fmt = QTextCharFormat()
-        fmt.setForeground(QColor("#000000"))
-        doc = self.transcript_display.document()
-        cursor = self.transcript_display.textCursor()
-        if self._partial_block_num is not None:
-            block = doc.findBlockByNumber(self._partial_block_num)
-            if block.isValid():
-                cursor.setPosition(block.position())
-                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
-                cursor.removeSelectedText()
-                cursor.mergeCharFormat(fmt)
-                cursor.insertText(text.strip() + "\n")
-                block.setUserState(0)
-        else:
-            cursor.movePosition(QTextCursor.End)
-            cursor.mergeCharFormat(fmt)
-            cursor.insertText(text.strip() + "\n")
-        self._partial_block_num = None
-        self.transcript_display.moveCursor(QTextCursor.End)
+    # partial / stable / speaker updates arrive through self.ui_scheduler, once per refresh tick
+    def appendStable(self, seq: int, text: str):
+        self.transcript_model.appendStable(seq, text)
+        self._followTail()
+
+    def _followTail(self):
+        #keep the newest line in view unless the user scrolled up to read
+        bar = self.transcript_display.verticalScrollBar()
+        if bar.value() >= bar.maximum() - 4:
+            self.transcript_display.scrollToBottom()
+
+    def onRediarized(self, changed: int):
+        self.statusBar().showMessage(f"Re-diarization changed {changed} speaker label(s).")
 
     # Close
     def closeEvent(self, event):
-        try:
-            if self.mic_thread.isRunning():
-                self.mic_thread.quit()
-                self.mic_thread.wait()
-            if self.audio_source:
-                self.audio_source.stop()
-            if self.timer:
-                self.timer.stop()
-            self.stopTranscription()
-        except Exception:
-            pass
+        # worker first: run() returns only after the executor drained, so every queued final is journaled
+        self.asr_worker.stop()
+        if self.asr_t is not None:
+            self.asr_t.join()
+        if self.mic_thread.isRunning():
+            self.mic_thread.quit()
+            self.mic_thread.wait()
+        if self.asr_worker.journal is not None:
+            self.asr_worker.journal.close()
         super().closeEvent(event)
 
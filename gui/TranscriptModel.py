@@ -0,0 +1,119 @@
+#Transcript Model = one row per stable segment plus a single mutable partial row at the end,
+#shown through a QListView so only visible rows are laid out and painted
+#only the newest max_rows lines are kept: the full session is in the journal / the worker's
+#word timeline, this is just the scrollback of the window
+import collections
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+
+class TranscriptModel(QAbstractListModel):
+    SeqRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None, max_rows=5000):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self._lines = collections.deque()   # "[ts] speaker: text" per stable segment
+        self._seqs = collections.deque()    # segment seq per row
+        self._rows = {}             # segment seq -> absolute row (row + self._dropped), for speaker backfill / relabel
+        self._dropped = 0           # rows trimmed off the top so far
+        self._partial = None        # text of the tail row, None = no tail row
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._lines) + (0 if self._partial is None else 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        partial = row == len(self._lines)
+        if role == Qt.DisplayRole:
+            return self._partial if partial else self._lines[row]
+        if role == Qt.ForegroundRole:
+            return QColor("#808080") if partial else QColor("#000000")
+        if role == self.SeqRole:
+            return None if partial else self._seqs[row]
+        return None
+
+    # Updates, O(1) whatever the session length ===============================================================
+    def setPartial(self, text: str):
+        text = text.strip()
+        tail = len(self._lines)
+        if self._partial is None:
+            self.beginInsertRows(QModelIndex(), tail, tail)
+            self._partial = text
+            self.endInsertRows()
+        else:
+            self._partial = text
+            idx = self.index(tail)
+            self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+
+    def _push(self, seq: int, text: str):
+        self._rows[seq] = len(self._lines) + self._dropped
+        self._lines.append(text.strip())
+        self._seqs.append(seq)
+
+    def appendStable(self, seq: int, text: str):
+        #the partial tail row (if any) becomes the stable row
+        row = len(self._lines)
+        if self._partial is None:
+            self.beginInsertRows(QModelIndex(), row, row)
+        self._push(seq, text)
+        if self._partial is None:
+            self.endInsertRows()
+        else:
+            self._partial = None
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx, [Qt.DisplayRole, Qt.ForegroundRole])
+        self._trim()
+
+    def appendStableBatch(self, items: list):
+        #several (seq, line) at once: the partial tail row takes the first, the rest is one row insert
+        if not items:
+            return
+        if self._partial is not None:
+            self.appendStable(*items[0])
+            items = items[1:]
+            if not items:
+                return
+        first = len(self._lines)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        for seq, text in items:
+            self._push(seq, text)
+        self.endInsertRows()
+        self._trim()
+
+    def _trim(self):
+        #drop the oldest rows beyond max_rows in one removal
+        extra = len(self._lines) - self.max_rows
+        if extra <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, extra - 1)
+        for _ in range(extra):
+            self._lines.popleft()
+            del self._rows[self._seqs.popleft()]
+        self._dropped += extra
+        self.endRemoveRows()
+
+    def updateStable(self, seq: int, text: str):
+        row = self._rows.get(seq)
+        if row is None: #trimmed, or never shown
+            return
+        row -= self._dropped
+        self._lines[row] = text.strip()
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self._seqs.clear()
+        self._rows.clear()
+        self._dropped = 0
+        self._partial = None
+        self.endResetModel()
+
+    def toPlainText(self) -> str:
+        #shown lines only, see the header
+        return "\n".join(self._lines)
@@ -0,0 +1,77 @@
+#Ui Scheduler = coalesces worker / mic signals and applies them to the widgets once per refresh tick
+from PySide6.QtCore import QObject, QTimer, Slot
+
+
+class UiScheduler(QObject):
+    # per tick:
+    #   stable  -> every segment since the last tick, inserted into the model in one batch
+    #   speaker -> latest line per segment
+    #   partial -> latest text only; dropped if a stable segment arrived after it or it is unchanged
+    #   level   -> loudest block since the last tick
+    # the timer only runs while something is pending, an idle session costs no wakeups
+    def __init__(self, model, on_level, on_tail, refresh_hz=30, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.on_level = on_level            # callable(rms)
+        self.on_tail = on_tail              # callable(), after rows were added
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 / refresh_hz))
+        self.timer.timeout.connect(self.flush)
+        self.reset()
+
+    def reset(self):
+        self.stables = []
+        self.speakers = {}
+        self.partial = None
+        self.shown_partial = None
+        self.level = None
+
+    def _schedule(self):
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @Slot(str)
+    def onPartial(self, text: str):
+        self.partial = text
+        self._schedule()
+
+    @Slot(int, str)
+    def onStable(self, seq: int, text: str):
+        self.stables.append((seq, text))
+        self.partial = None                 # older than this segment
+        self._schedule()
+
+    @Slot(int, str)
+    def onSpeaker(self, seq: int, text: str):
+        self.speakers[seq] = text
+        self._schedule()
+
+    @Slot(float)
+    def onLevel(self, rms: float):
+        self.level = rms if self.level is None else max(self.level, rms)
+        self._schedule()
+
+    @Slot()
+    def flush(self):
+        added = False
+        if self.stables:
+            self.model.appendStableBatch(self.stables)
+            self.stables = []
+            self.shown_partial = None
+            added = True
+        if self.speakers: #segments added above are in the model already
+            for seq, text in self.speakers.items():
+                self.model.updateStable(seq, text)
+            self.speakers = {}
+        if self.partial is not None:
+            if self.partial != self.shown_partial: #partial lines carry the utterance start, equal line = same text + speaker
+                self.model.setPartial(self.partial)
+                self.shown_partial = self.partial
+                added = True
+            self.partial = None
+        if self.level is not None:
+            self.on_level(self.level)
+            self.level = None
+        if added:
+            self.on_tail()
+        self.timer.stop()                   # restarted by the next signal